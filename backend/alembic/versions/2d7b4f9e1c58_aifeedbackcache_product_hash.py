@@ -0,0 +1,33 @@
+"""aifeedbackcache product_hash
+
+Revision ID: 2d7b4f9e1c58
+Revises: f6a9c2e4b815
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d7b4f9e1c58'
+down_revision: Union[str, Sequence[str], None] = 'f6a9c2e4b815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows get '' and so never match a product hash; they are
+    # regenerated on the next scan.
+    op.add_column(
+        'aifeedbackcache',
+        sa.Column('product_hash', sa.String(), nullable=False, server_default=''),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('aifeedbackcache', 'product_hash')
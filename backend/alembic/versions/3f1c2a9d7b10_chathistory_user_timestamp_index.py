@@ -0,0 +1,42 @@
+"""chathistory (user_id, timestamp) index
+
+Revision ID: 3f1c2a9d7b10
+Revises: a47e2d90c6f1
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c2a9d7b10'
+down_revision: Union[str, Sequence[str], None] = 'a47e2d90c6f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY so existing deployments don't lock chathistory while it builds.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_chathistory_user_id_timestamp',
+            'chathistory',
+            ['user_id', 'timestamp'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_chathistory_user_id_timestamp',
+            table_name='chathistory',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,36 @@
+"""productcache table
+
+Revision ID: 5c2e8f1a9d34
+Revises: d81f3c6b2e57
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c2e8f1a9d34'
+down_revision: Union[str, Sequence[str], None] = 'd81f3c6b2e57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # if_not_exists: databases that already started the app have it from create_all.
+    op.create_table(
+        'productcache',
+        sa.Column('barcode', sa.String(), nullable=False),
+        sa.Column('product_data', sa.String(), nullable=False),
+        sa.Column('fetched_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('barcode'),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('productcache')
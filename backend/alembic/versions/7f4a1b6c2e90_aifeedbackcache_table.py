@@ -0,0 +1,38 @@
+"""aifeedbackcache table
+
+Revision ID: 7f4a1b6c2e90
+Revises: 5c2e8f1a9d34
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7f4a1b6c2e90'
+down_revision: Union[str, Sequence[str], None] = '5c2e8f1a9d34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # if_not_exists: databases that already started the app have it from create_all.
+    op.create_table(
+        'aifeedbackcache',
+        sa.Column('barcode', sa.String(), nullable=False),
+        sa.Column('profile_fingerprint', sa.String(), nullable=False),
+        sa.Column('prompt_version', sa.String(), nullable=False),
+        sa.Column('feedback', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('barcode', 'profile_fingerprint', 'prompt_version'),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('aifeedbackcache')
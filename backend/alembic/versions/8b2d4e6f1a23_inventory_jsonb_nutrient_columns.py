@@ -0,0 +1,77 @@
+"""inventory product_data as JSONB, typed nutrient columns
+
+Revision ID: 8b2d4e6f1a23
+Revises: 3f1c2a9d7b10
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2d4e6f1a23'
+down_revision: Union[str, Sequence[str], None] = '3f1c2a9d7b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NUTRIENT_COLUMNS = (
+    'sugars_100g',
+    'salt_100g',
+    'fat_100g',
+    'saturated_fat_100g',
+    'proteins_100g',
+    'energy_kcal_100g',
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Rows written before this migration hold whatever text the client sent;
+    # anything that isn't valid JSON is kept as a JSON string instead of failing.
+    op.execute("""
+        CREATE FUNCTION pg_temp.nutrio_to_jsonb(value text) RETURNS jsonb AS $$
+        BEGIN
+            RETURN value::jsonb;
+        EXCEPTION WHEN others THEN
+            RETURN to_jsonb(value);
+        END;
+        $$ LANGUAGE plpgsql IMMUTABLE
+    """)
+    op.alter_column(
+        'inventory',
+        'product_data',
+        type_=postgresql.JSONB(),
+        postgresql_using='pg_temp.nutrio_to_jsonb(product_data)',
+    )
+
+    for column in NUTRIENT_COLUMNS:
+        op.add_column('inventory', sa.Column(column, sa.Float(), nullable=True))
+    op.add_column('inventory', sa.Column('nova_group', sa.Integer(), nullable=True))
+    op.add_column('inventory', sa.Column('nutrition_grade', sa.String(), nullable=True))
+
+    op.create_index(
+        'ix_inventory_product_data',
+        'inventory',
+        ['product_data'],
+        postgresql_using='gin',
+    )
+    # Typed columns for existing rows are filled by: python -m app.integrations.nutrients
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_inventory_product_data', table_name='inventory')
+    op.drop_column('inventory', 'nutrition_grade')
+    op.drop_column('inventory', 'nova_group')
+    for column in reversed(NUTRIENT_COLUMNS):
+        op.drop_column('inventory', column)
+    op.alter_column(
+        'inventory',
+        'product_data',
+        type_=sa.String(),
+        postgresql_using='product_data::text',
+    )
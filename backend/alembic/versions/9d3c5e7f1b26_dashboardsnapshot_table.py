@@ -0,0 +1,40 @@
+"""dashboardsnapshot table
+
+Revision ID: 9d3c5e7f1b26
+Revises: 7f4a1b6c2e90
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3c5e7f1b26'
+down_revision: Union[str, Sequence[str], None] = '7f4a1b6c2e90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # if_not_exists: databases that already started the app have it from create_all.
+    op.create_table(
+        'dashboardsnapshot',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('timeline', sa.String(), nullable=False),
+        sa.Column('inventory_hash', sa.String(), nullable=False),
+        sa.Column('profile_hash', sa.String(), nullable=False),
+        sa.Column('analysis', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('user_id', 'timeline'),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('dashboardsnapshot')
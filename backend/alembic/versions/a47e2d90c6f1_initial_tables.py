@@ -0,0 +1,77 @@
+"""user, chathistory and inventory as first created by create_all
+
+Revision ID: a47e2d90c6f1
+Revises: 
+Create Date: 2026-10-18 08:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a47e2d90c6f1'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Databases created by the startup create_all already have these tables;
+    # if_not_exists lets them run the chain from here, while an empty database
+    # gets the original schema that the later revisions expect.
+    op.create_table(
+        'user',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('password_hash', sa.String(), nullable=False),
+        sa.Column('gender', sa.String(), nullable=True),
+        sa.Column('health_issues', sa.String(), nullable=True),
+        sa.Column('dietary_preferences', sa.String(), nullable=True),
+        sa.Column('goals', sa.String(), nullable=True),
+        sa.Column('weight', sa.Integer(), nullable=True),
+        sa.Column('height', sa.Integer(), nullable=True),
+        sa.Column('health_details', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_index('ix_user_email', 'user', ['email'], unique=True, if_not_exists=True)
+    op.create_table(
+        'chathistory',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('message', sa.String(), nullable=False),
+        sa.Column('response', sa.String(), nullable=False),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'inventory',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('barcode', sa.String(), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('img', sa.String(), nullable=False),
+        sa.Column('tag', sa.String(), nullable=False),
+        sa.Column('nutrient_score', sa.String(), nullable=False),
+        sa.Column('product_data', sa.String(), nullable=False),
+        sa.Column('ai_feedback', sa.String(), nullable=False),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('barcode', name='inventory_pkey'),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('inventory')
+    op.drop_table('chathistory')
+    op.drop_index('ix_user_email', table_name='user')
+    op.drop_table('user')
@@ -0,0 +1,41 @@
+"""inventory (user_id, timestamp) index
+
+Revision ID: c5e7a9b3d412
+Revises: 8b2d4e6f1a23
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e7a9b3d412'
+down_revision: Union[str, Sequence[str], None] = '8b2d4e6f1a23'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_inventory_user_id_timestamp',
+            'inventory',
+            ['user_id', 'timestamp'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_inventory_user_id_timestamp',
+            table_name='inventory',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
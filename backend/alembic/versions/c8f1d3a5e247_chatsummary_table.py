@@ -0,0 +1,38 @@
+"""chatsummary table
+
+Revision ID: c8f1d3a5e247
+Revises: b2e6a8d4c173
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8f1d3a5e247'
+down_revision: Union[str, Sequence[str], None] = 'b2e6a8d4c173'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # if_not_exists: databases that already started the app have it from create_all.
+    op.create_table(
+        'chatsummary',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('summary', sa.String(), nullable=False),
+        sa.Column('last_chat_id', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('user_id'),
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('chatsummary')
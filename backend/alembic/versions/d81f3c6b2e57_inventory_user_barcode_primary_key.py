@@ -0,0 +1,32 @@
+"""inventory primary key (user_id, barcode)
+
+Revision ID: d81f3c6b2e57
+Revises: c5e7a9b3d412
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f3c6b2e57'
+down_revision: Union[str, Sequence[str], None] = 'c5e7a9b3d412'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # barcode alone was the key, so two users could not hold the same product.
+    op.drop_constraint('inventory_pkey', 'inventory', type_='primary')
+    op.create_primary_key('inventory_pkey', 'inventory', ['user_id', 'barcode'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Fails if several users now hold the same barcode; resolve those rows first.
+    op.drop_constraint('inventory_pkey', 'inventory', type_='primary')
+    op.create_primary_key('inventory_pkey', 'inventory', ['barcode'])
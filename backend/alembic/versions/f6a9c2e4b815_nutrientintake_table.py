@@ -0,0 +1,43 @@
+"""nutrientintake table
+
+Revision ID: f6a9c2e4b815
+Revises: c8f1d3a5e247
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6a9c2e4b815'
+down_revision: Union[str, Sequence[str], None] = 'c8f1d3a5e247'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # if_not_exists: databases that already started the app have it from create_all.
+    op.create_table(
+        'nutrientintake',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('period', sa.String(), nullable=False),
+        sa.Column('period_start', sa.Date(), nullable=False),
+        sa.Column('nutrient', sa.String(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('exceeded', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('user_id', 'period', 'period_start', 'nutrient'),
+        if_not_exists=True,
+    )
+    # Totals for inventory added before this table existed are filled by:
+    # python -m app.integrations.intake
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('nutrientintake')
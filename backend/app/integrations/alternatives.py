@@ -0,0 +1,235 @@
+import os
+import json
+import asyncio
+import threading
+import warnings
+
+import numpy as np
+from sqlmodel import select
+
+from app.models import ProductCache
+from app.database import async_session
+from app.integrations.app import rank_score
+from app.integrations.rules import build_limits, per_100g_ratios, score_products
+
+ALTERNATIVES_INDEX_SIZE = int(os.getenv("ALTERNATIVES_INDEX_SIZE", "50000"))
+# Nearest products (by nutrient profile) considered before filtering for "better".
+NEIGHBOURS = 100
+MIN_CATEGORY_SIZE = 5
+MIN_SCORE_GAIN = 5.0
+# Rows added to the vector matrix each time it fills up.
+MATRIX_CHUNK = 1024
+
+# OpenFoodFacts per-100 g key -> scale that maps typical values to roughly 0..1.
+FEATURES = {
+    "energy-kcal_100g": 900.0,
+    "fat_100g": 100.0,
+    "saturated-fat_100g": 50.0,
+    "carbohydrates_100g": 100.0,
+    "sugars_100g": 100.0,
+    "fiber_100g": 30.0,
+    "proteins_100g": 50.0,
+    "salt_100g": 5.0,
+}
+_SCALES = np.array(list(FEATURES.values()))
+# Column of each OpenFoodFacts key in an unscaled feature matrix, for rules.per_100g_ratios.
+_COLUMNS = {key.removesuffix("_100g"): j for j, key in enumerate(FEATURES)}
+_KEPT_FIELDS = ("code", "product_name", "nutrition_grades", "nova_group", "image_url", "serving_size")
+_KEPT_NUTRIMENTS = tuple(FEATURES) + ("sodium_100g", "trans-fat_100g", "cholesterol_100g", "energy_100g")
+
+
+def _float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def feature_vector(product: dict) -> np.ndarray:
+    """
+    Scaled per-100 g nutriments; missing values stay NaN and are ignored
+    by the distance.
+    """
+    nutriments = product.get("nutriments") or {}
+    return np.array([_float(nutriments.get(key)) / scale for key, scale in FEATURES.items()], dtype=float)
+
+
+def _slim(product: dict) -> dict:
+    slim = {field: product.get(field) for field in _KEPT_FIELDS}
+    nutriments = product.get("nutriments") or {}
+    slim["nutriments"] = {
+        key: value for key, value in nutriments.items()
+        if key in _KEPT_NUTRIMENTS or key.endswith("_serving")
+    }
+    return slim
+
+
+class ProductIndex:
+    """
+    In-memory nearest-neighbour index over cached OpenFoodFacts products:
+    one scaled nutriment vector per barcode, kept as rows of a matrix that
+    grows in MATRIX_CHUNK steps, plus an inverted index from category tag to
+    rows. Queries stay within the product's most specific well-populated
+    category.
+    """
+
+    def __init__(self, maxsize: int = ALTERNATIVES_INDEX_SIZE):
+        self.maxsize = maxsize
+        self._rows = {}
+        self._products = []
+        self._categories = []
+        self._by_category = {}
+        self._matrix = np.empty((0, len(FEATURES)))
+        self._lock = threading.Lock()
+
+    def add(self, barcode: str, product: dict) -> bool:
+        """
+        Adds or refreshes a product. Products without category tags or
+        nutriments can't be matched and are skipped.
+        """
+        categories = product.get("categories_tags") or []
+        vector = feature_vector(product)
+        if not categories or np.isnan(vector).all():
+            return False
+
+        with self._lock:
+            row = self._rows.get(barcode)
+            if row is None:
+                if len(self._products) >= self.maxsize:
+                    return False
+                row = len(self._products)
+                self._rows[barcode] = row
+                self._products.append(None)
+                self._categories.append(())
+                if row == len(self._matrix):
+                    grown = np.empty((min(row + MATRIX_CHUNK, self.maxsize), len(FEATURES)))
+                    grown[:row] = self._matrix
+                    self._matrix = grown
+            for tag in self._categories[row]:
+                self._by_category[tag].discard(row)
+            self._products[row] = _slim(product)
+            self._categories[row] = tuple(categories)
+            self._matrix[row] = vector
+            for tag in categories:
+                self._by_category.setdefault(tag, set()).add(row)
+        return True
+
+    def _candidates(self, categories: list, exclude: int | None) -> list[int]:
+        # categories_tags run from broad to specific ("en:snacks" ... "en:chocolate-biscuits").
+        best = []
+        for tag in reversed(categories):
+            rows = self._by_category.get(tag, set()) - {exclude}
+            if len(rows) >= MIN_CATEGORY_SIZE:
+                return sorted(rows)
+            if len(rows) > len(best):
+                best = sorted(rows)
+        return best
+
+    def alternatives(self, barcode: str, product: dict, health_issues: str | None,
+                     gender: str | None = None, limit: int = 5) -> list[dict]:
+        """
+        Up to `limit` products from the same category whose score for this
+        user (see app.rank_score, from the stored per-100 g vectors) beats
+        the product's by MIN_SCORE_GAIN, picked among its nearest neighbours
+        by nutrient profile.
+        """
+        with self._lock:
+            rows = self._candidates(product.get("categories_tags") or [], self._rows.get(barcode))
+            vectors = self._matrix[rows]
+            products = [self._products[row] for row in rows]
+        if not rows:
+            return []
+
+        query = feature_vector(product)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            distances = np.nanmean((vectors - query) ** 2, axis=1)
+        distances = np.where(np.isnan(distances), np.inf, distances)
+        nearest = np.argsort(distances, kind="stable")[:NEIGHBOURS]
+
+        # Row 0 is the product itself, the rest its neighbours.
+        pool = [product] + [products[i] for i in nearest]
+        limits = build_limits(health_issues, gender or "male")
+        ratios = per_100g_ratios(np.vstack([query, vectors[nearest]]) * _SCALES, _COLUMNS, limits)
+        worst = np.where(np.isnan(ratios), -np.inf, ratios).max(axis=1, initial=-np.inf)
+        scores = [
+            rank_score(float(ratio) if np.isfinite(ratio) else None, p.get("nutrition_grades"), p.get("nova_group"))
+            for ratio, p in zip(worst, pool)
+        ]
+        baseline = scores[0]
+
+        better = sorted(
+            (i for i in range(1, len(pool)) if scores[i] >= baseline + MIN_SCORE_GAIN),
+            key=lambda i: (-scores[i], i)
+        )[:limit]
+        verdicts = score_products([pool[i] for i in better], limits) if limits else [{"offending": []} for _ in better]
+
+        results = []
+        for i, verdict in zip(better, verdicts):
+            candidate = pool[i]
+            results.append({
+                "barcode": candidate.get("code"),
+                "product_name": candidate.get("product_name"),
+                "nutrition_grades": candidate.get("nutrition_grades"),
+                "nova_group": candidate.get("nova_group"),
+                "image_url": candidate.get("image_url"),
+                "score": scores[i],
+                "score_gain": round(scores[i] - baseline, 1),
+                "over_limit": [o["nutrient"] for o in verdict["offending"]]
+            })
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "products": len(self._rows),
+            "categories": len(self._by_category),
+            "maxsize": self.maxsize
+        }
+
+
+_index = ProductIndex()
+_loading = None
+
+
+def get_product_index() -> ProductIndex:
+    return _index
+
+
+async def load_from_cache(batch_size: int = 1000) -> int:
+    """
+    Seeds the index from the ProductCache table, in barcode order.
+    """
+    loaded = 0
+    after = None
+    async with async_session() as db:
+        while True:
+            statement = select(ProductCache.barcode, ProductCache.product_data).order_by(ProductCache.barcode).limit(batch_size)
+            if after is not None:
+                statement = statement.where(ProductCache.barcode > after)
+            result = await db.exec(statement)
+            rows = result.all()
+            if not rows:
+                return loaded
+            for barcode, product_data in rows:
+                try:
+                    loaded += _index.add(barcode, json.loads(product_data))
+                except ValueError:
+                    continue
+            after = rows[-1][0]
+
+
+def start_loading() -> None:
+    """
+    Called from main.lifespan; builds the index in the background so
+    startup isn't delayed. Queries before it finishes see fewer products.
+    """
+    global _loading
+
+    async def run():
+        try:
+            print(f"Alternatives index loaded {await load_from_cache()} products")
+        except Exception as e:
+            print(f"Alternatives index load failed: {e}")
+
+    if _loading is None:
+        _loading = asyncio.create_task(run())
@@ -1,32 +1,56 @@
-import os
-import time
-from dotenv import load_dotenv
-from google import genai
+import asyncio
+import logging
+import threading
+import numpy as np
 from google.genai.errors import ServerError
-from app.integrations.rag_utils import get_relevant_passages, get_chroma_db
+from app.integrations.rag_utils import get_relevant_passages, get_chroma_db, check_collections
 from app.integrations.memory import ShortTermMemory
+from app.integrations import llm
+from app.integrations.guidelines import get_guideline_index, limits_summary, PRODUCT_CATEGORIES
+from app.integrations.rules import build_limits, inventory_summary, per_100g_ratios, per_100g_table, score_product, score_products, verdict_text
+from app.integrations.prompt_builder import build_inventory_context, compact_product, record_usage
 import json
 
-load_dotenv()
-api_key = os.getenv("GEMINI_API")
-client = genai.Client(api_key=api_key)
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLLECTIONS = ("disease-guidelines",)
+
+DASHBOARD_FALLBACK = {
+    "health_score": 0,
+    "prediction_summary": "Unable to generate prediction.",
+    "mood_analysis": {"state": "N/A", "mechanism": "N/A"},
+    "body_analysis": {"state": "N/A", "mechanism": "N/A"},
+    "key_nutrients": [],
+    "recommendation": "Please try again."
+}
+
+# Bump when the analyze prompt changes so cached product feedback is regenerated.
+ANALYZE_PROMPT_VERSION = "1"
+
+_analyzer_lock = threading.Lock()
+_analyzers = {}
 
 
 class NutritionAnalyzer:
    
     def __init__(self, db_name="disease-guidelines"):
         self.db = get_chroma_db(db_name)
-        self.memory = ShortTermMemory(max_turns=6)
         
-    def analyze(self, gender,goals,allergies, disease,nutrition_text, user_query, n_results=5, ask_qs = True):
+    async def analyze(self, gender,goals,allergies, disease,nutrition_text, user_query, n_results=5, ask_qs = True):
            
-        self.memory.add("user", user_query)
+           
+        memory = ShortTermMemory(max_turns=6)
+        memory.add("user", user_query)
         search_query = (
             f"{user_query}. "
             f"This is about nutrition guidelines for {disease} and applies to {gender}."
         )
 
-        relevant_guidelines = get_relevant_passages(self.db, search_query, n_results=n_results)
+           
+           
+        relevant_guidelines = get_guideline_index().passages(disease, gender, categories=PRODUCT_CATEGORIES)
+        if not relevant_guidelines:
+            relevant_guidelines = await asyncio.to_thread(get_relevant_passages, self.db, search_query, n_results=n_results)
         
         if relevant_guidelines:
             guidelines_context = "\n\nRelevant Guidelines from Database:\n"
@@ -38,7 +62,7 @@ class NutritionAnalyzer:
         else:
             guidelines_context = "\n\nNo specific guidelines found in our database for this query."
         
-        conversation_context = self.memory.get_context() 
+        conversation_context = memory.get_context() 
         system_prompt = f"""You are a Nutrition Assistant at Nutrio. Your job is to analyze food products and provide personalized nutrition guidance based on user health conditions.
 
             Conversation so far:
@@ -71,65 +95,57 @@ class NutritionAnalyzer:
             Be empathetic, clear, and actionable in your response. Dont make it long try to keep it under 60 words."""
 
            
-        max_retries = 3
-        retry_delay = 2     
-        
-        for attempt in range(max_retries):
-            try:
-                response = client.models.generate_content(
-                    model='gemini-2.5-flash',
-                    contents=system_prompt
-                )
-                   
-                self.memory.add("assistant", response.text)
-
-                
-                return {
-                    'success': True,
-                    'recommendation': response.text,
-                    'relevant_guidelines': relevant_guidelines,
-                    'nutrition_summary': nutrition_text
-                }
-            except ServerError as e:
-                   
-                if '503' in str(e) or 'overloaded' in str(e).lower():
-                    if attempt < max_retries - 1:
-                        wait_time = retry_delay * (2 ** attempt)     
-                        print(f"Model overloaded. Retrying in {wait_time} seconds... (Attempt {attempt + 1}/{max_retries})")
-                        time.sleep(wait_time)
-                        continue
-                    else:
-                        print(f"DEBUG - Error occurred after {max_retries} attempts: {str(e)}")
-                        return {
-                            'success': False,
-                            'error': str(e),
-                            'message': "The AI service is currently experiencing high load. Please try again in a few moments."
-                        }
-                else:
-                       
-                    print(f"DEBUG - Server error occurred: {str(e)}")
-                    return {
-                        'success': False,
-                        'error': str(e),
-                        'message': "I apologize, but I encountered a server error. Please try again."
-                    }
-            except Exception as e:
-                print(f"DEBUG - Error occurred: {str(e)}")
-                print(f"DEBUG - Error type: {type(e).__name__}")
-                import traceback
-                traceback.print_exc()
+        try:
+            response_text = await llm.generate(system_prompt)
+               
+            memory.add("assistant", response_text)
+
+            return {
+                'success': True,
+                'recommendation': response_text,
+                'relevant_guidelines': relevant_guidelines,
+                'nutrition_summary': nutrition_text
+            }
+        except ServerError as e:
+               
+            if llm._is_overloaded(e):
+                print(f"DEBUG - Error occurred after {llm.LLM_MAX_RETRIES} attempts: {str(e)}")
                 return {
                     'success': False,
                     'error': str(e),
-                    'message': "I apologize, but I encountered an error while analyzing this product. Please try again."
+                    'message': "The AI service is currently experiencing high load. Please try again in a few moments."
                 }
+            print(f"DEBUG - Server error occurred: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'message': "I apologize, but I encountered a server error. Please try again."
+            }
+        except llm.LLMTimeoutError as e:
+            print(f"DEBUG - Timeout: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'message': "The AI service took too long to respond. Please try again."
+            }
+        except Exception as e:
+            print(f"DEBUG - Error occurred: {str(e)}")
+            print(f"DEBUG - Error type: {type(e).__name__}")
+            import traceback
+            traceback.print_exc()
+            return {
+                'success': False,
+                'error': str(e),
+                'message': "I apologize, but I encountered an error while analyzing this product. Please try again."
+            }
             
-    def process_chat_message(user_message: str, user_profile: dict, history_context: str) -> dict:
+    @staticmethod
+    async def build_chat_prompt(user_message: str, user_profile: dict, history_context: str) -> str:
         """
-        Analyzes a chat message using RAG context + Database History.
+        Builds the chat prompt from RAG context + Database History.
         """
            
-        analyzer = NutritionAnalyzer(db_name="disease-guidelines")
+        analyzer = get_analyzer("disease-guidelines")
         
            
            
@@ -139,7 +155,7 @@ class NutritionAnalyzer:
             f"and goals: {user_profile.get('goals', 'general health')}."
         )
         
-        relevant_guidelines = get_relevant_passages(analyzer.db, search_query, n_results=3)
+        relevant_guidelines = await asyncio.to_thread(get_relevant_passages, analyzer.db, search_query, n_results=3)
         
         guidelines_text = ""
         if relevant_guidelines:
@@ -167,16 +183,21 @@ class NutritionAnalyzer:
         If the user asks about previous topics, refer to the history. 
         Keep the tone encouraging, concise (under 80 words), and safe. 
         If you don't know something, admit it politely."""
+        return system_prompt
+
+    @staticmethod
+    async def process_chat_message(user_message: str, user_profile: dict, history_context: str) -> dict:
+        """
+        Analyzes a chat message using RAG context + Database History.
+        """
+        system_prompt = await NutritionAnalyzer.build_chat_prompt(user_message, user_profile, history_context)
 
            
         try:
-            response = client.models.generate_content(
-                model='gemini-2.5-flash',
-                contents=system_prompt
-            )
+            response_text = await llm.generate(system_prompt)
             return {
                 'success': True,
-                'response': response.text
+                'response': response_text
             }
         except Exception as e:
             print(f"Chat Error: {str(e)}")
@@ -184,10 +205,24 @@ class NutritionAnalyzer:
                 'success': False,
                 'response': "I'm having trouble connecting right now. Please try again."
             }
-    def analyze_user_dashboard(self, user_profile: dict, inventory_items: list, timeline: str = "1 year") -> dict:
+
+    @staticmethod
+    async def stream_chat_message(user_message: str, user_profile: dict, history_context: str):
+        """
+        Same as process_chat_message, but yields the reply chunk by chunk.
+        Errors are raised to the caller, which decides what the client sees.
+        """
+        system_prompt = await NutritionAnalyzer.build_chat_prompt(user_message, user_profile, history_context)
+        async for chunk in llm.stream(system_prompt):
+            yield chunk
+
+    async def analyze_user_dashboard(self, user_profile: dict, inventory_items: list, timeline: str = "1 year",
+                                     intake_context: str = "") -> dict:
         """
-        Analyzes the user's entire inventory by processing the detailed 'product_data' 
-        of each item to predict long-term health outcomes.
+        Analyzes the user's entire inventory, summarized per item by
+        build_inventory_context within DASHBOARD_PROMPT_TOKENS, to predict
+        long-term health outcomes. `intake_context` carries the measured
+        per-period aggregates from integrations/intake.py.
         """
            
         if not inventory_items:
@@ -200,22 +235,10 @@ class NutritionAnalyzer:
             }
 
            
-        inventory_context = "User's Current Dietary Intake (based on Inventory Data):\n"
-        
-        for item in inventory_items:
-               
-            title = getattr(item, 'title', 'Unknown Product')
-            score = getattr(item, 'nutrient_score', 'N/A')
-            
-               
-               
-            raw_data = getattr(item, 'product_data', '')[:300] 
-            
-            inventory_context += f"""
-            - Product: {title}
-              Nutri-Score: {score}
-              Details: {raw_data}
-            """
+        inventory_context, _ = build_inventory_context(inventory_items)
+        guideline_context = inventory_summary(
+            inventory_items, user_profile.get('disease'), user_profile.get('gender')
+        )
 
            
         disease = user_profile.get('disease', 'General Health')
@@ -226,7 +249,7 @@ class NutritionAnalyzer:
             f"Mechanisms linking processed food, sugar, and additives to mood and brain structure."
         )
         
-        relevant_passages = get_relevant_passages(self.db, search_query, n_results=4)
+        relevant_passages = await asyncio.to_thread(get_relevant_passages, self.db, search_query, n_results=4)
         
         clinical_context = ""
         if relevant_passages:
@@ -250,16 +273,18 @@ class NutritionAnalyzer:
 
         INVENTORY DATA (The Food They Eat):
         {inventory_context}
+        {guideline_context}
+        {intake_context}
 
         TASK:
-        Analyze the "Details" (ingredients/nutrients) of the products listed above. 
+        Analyze the nutrient data (Nutri-Score, NOVA, per-100 g values) of the products listed above. 
         Predict the specific biological impact on this user if they consume this inventory regularly for {timeline}.
 
         REQUIREMENTS:
         1. **Health Score**: 0-100 (Based on nutrient density vs. processing level).
         2. **Mood Analysis**: Use the ingredient data to predict neurochemical effects (e.g., "High sugar causing dopamine crashes", "Additives linked to anxiety").
         3. **Body Analysis**: Predict physiological outcomes (e.g., "Inflammation markers may rise due to processed oils found in Product X").
-        4. **Nutrients of Concern**: Identify the specific bad actors hidden in the `product_data`.
+        4. **Nutrients of Concern**: Identify the specific bad actors in the inventory data.
 
         OUTPUT FORMAT (STRICT JSON ONLY):
         {{
@@ -281,31 +306,54 @@ class NutritionAnalyzer:
         }}
         """
 
+        record_usage("dashboard", system_prompt)
         try:
-            response = client.models.generate_content(
-                model='gemini-2.5-flash',
-                contents=system_prompt,
-                config=genai.types.GenerateContentConfig(
-                    response_mime_type="application/json"
-                )
-            )
+            response_text = await llm.generate(system_prompt, json_output=True)
             
-            return json.loads(response.text)
+            return json.loads(response_text)
             
         except Exception as e:
             print(f"Dashboard Prediction Error: {e}")
-            return {
-                "health_score": 0,
-                "prediction_summary": "Unable to generate prediction.",
-                "mood_analysis": {"state": "N/A", "mechanism": "N/A"},
-                "body_analysis": {"state": "N/A", "mechanism": "N/A"},
-                "key_nutrients": [],
-                "recommendation": "Please try again."
-            }
+            return dict(DASHBOARD_FALLBACK)
+
+def get_analyzer(db_name: str = "disease-guidelines") -> NutritionAnalyzer:
+    """
+    Returns the process-wide analyzer for `db_name`. The analyzer only holds
+    the shared collection handle, so it is safe to use from concurrent requests.
+    """
+    analyzer = _analyzers.get(db_name)
+    if analyzer is None:
+        with _analyzer_lock:
+            analyzer = _analyzers.get(db_name)
+            if analyzer is None:
+                analyzer = NutritionAnalyzer(db_name=db_name)
+                _analyzers[db_name] = analyzer
+    return analyzer
+
+
+def warm_up(collections=REQUIRED_COLLECTIONS) -> None:
+    """
+    Called once from the FastAPI lifespan. Fails fast if a required collection
+    is missing, then builds the shared analyzers so the first request does not
+    pay for opening Chroma.
+    """
+    check_collections(collections)
+    for name in collections:
+        get_analyzer(name)
+    get_guideline_index()
+    logger.info("Nutrition analyzer ready (collections: %s)", ", ".join(collections))
+
+
+async def analyze_nutrition(nutrition:dict,disease:str,gender:str='male',goals:str='none',allergies:str='none') -> str:
+       
+       
+    verdict = score_product(nutrition or {}, disease, gender)
+    has_allergies = allergies and allergies.lower() != 'none'
+    if verdict["clear_cut"] and (verdict["verdict"] == "Avoid" or not has_allergies):
+        return verdict_text(verdict)
 
-def analyze_nutrition(nutrition:dict,disease:str,gender:str='male',goals:str='none',allergies:str='none') -> str:
-    analyzer = NutritionAnalyzer(db_name="disease-guidelines")
-    result = analyzer.analyze(
+    analyzer = get_analyzer("disease-guidelines")
+    result = await analyzer.analyze(
         gender=gender,     
         disease=disease,
         goals=goals,
@@ -324,12 +372,12 @@ def analyze_nutrition(nutrition:dict,disease:str,gender:str='male',goals:str='no
             return "Error"
 
 
-def generate_dashboard_stats(user: dict, inventory: list, timeline:str = "1 year") -> dict:
-    analyzer = NutritionAnalyzer(db_name="disease-guidelines")
-    return analyzer.analyze_user_dashboard(user, inventory, timeline)
+async def generate_dashboard_stats(user: dict, inventory: list, timeline:str = "1 year", intake_context: str = "") -> dict:
+    analyzer = get_analyzer("disease-guidelines")
+    return await analyzer.analyze_user_dashboard(user, inventory, timeline, intake_context)
 
 
-def compare_products(
+async def compare_products(
     product1: dict,
     product2: dict,
     disease: str,
@@ -341,35 +389,26 @@ def compare_products(
     Compare two products and determine which is better for the user.
     """
 
-    analyzer = NutritionAnalyzer(db_name="disease-guidelines")
+    analyzer = get_analyzer("disease-guidelines")
 
        
     guidelines_text = ""
     if disease and disease.lower() != "none":
-        guidelines = get_relevant_passages(
-            analyzer.db,
-            f"Dietary guidelines for {disease}",
-            n_results=1
-        )
-        if guidelines:
-            guidelines_text = f"Guideline: {guidelines[0]['content'][:120]}"
-
-       
-    def compact(p: dict) -> dict:
-        n = p.get("nutriments", {})
-        return {
-            "name": p.get("product_name"),
-            "grade": p.get("nutrition_grades"),
-            "nova": p.get("nova_group"),
-            "sugar": n.get("sugars_100g"),
-            "fat": n.get("fat_100g"),
-            "salt": n.get("salt_100g"),
-            "protein": n.get("proteins_100g"),
-            "ingredients": (p.get("ingredients_text") or "")[:150]
-        }
+        limits = limits_summary(get_guideline_index().lookup(disease, gender, categories=PRODUCT_CATEGORIES))
+        if limits:
+            guidelines_text = f"Guideline limits: {limits}"
+        else:
+            guidelines = await asyncio.to_thread(
+                get_relevant_passages,
+                analyzer.db,
+                f"Dietary guidelines for {disease}",
+                n_results=1
+            )
+            if guidelines:
+                guidelines_text = f"Guideline: {guidelines[0]['content'][:120]}"
 
-    p1 = compact(product1)
-    p2 = compact(product2)
+    p1 = compact_product(product1)
+    p2 = compact_product(product2)
 
     name1 = p1.get("name", "Product 1")
     name2 = p2.get("name", "Product 2")
@@ -421,17 +460,11 @@ Return STRICT JSON ONLY in this format:
 }}
 """.strip()
 
+    record_usage("compare", system_prompt)
     try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=system_prompt,
-            config=genai.types.GenerateContentConfig(
-                response_mime_type="application/json"
-            )
-        )
+        response_text = await llm.generate(system_prompt, json_output=True)
 
-        import json
-        data = json.loads(response.text)
+        data = json.loads(response_text)
         return {
             "success": True,
             "comparison": data
@@ -444,3 +477,126 @@ Return STRICT JSON ONLY in this format:
             "error": str(e),
             "message": "Unable to compare products at the moment. Please try again."
         }
+
+
+GRADE_PENALTY = {"a": 0, "b": 3, "c": 8, "d": 15, "e": 20}
+
+
+def rank_score(max_ratio: float | None, grade, nova) -> float:
+    """
+    0-100 from the worst per-100 g limit ratio (see rules.per_100g_ratios),
+    then Nutri-Score and NOVA processing level. The ratio penalty keeps
+    growing past the limit instead of capping, so products far over it still
+    rank by how far.
+    """
+    score = 100.0
+    if max_ratio is not None:
+        score -= 60 * max_ratio / (max_ratio + 0.5)
+    else:
+        # Nothing to check against the limits: rank below products known to be fine.
+        score -= 20
+    score -= GRADE_PENALTY.get(str(grade or "").lower(), 10)
+    if nova in (3, 4, "3", "4"):
+        score -= 5 * (int(nova) - 2)
+    return round(max(score, 0.0), 1)
+
+
+def local_rank(products: list[dict], disease: str, gender: str = "male") -> list[dict]:
+    """
+    Scores products 0-100 without the LLM (see rank_score), every product on
+    its per-100 g values so products with and without serving data compare
+    fairly. Verdicts and over-limit nutrients still come from the rule engine.
+    Returns one entry per product, best first (ties keep input order).
+    """
+    limits = build_limits(disease, gender)
+    results = score_products(products, limits) if limits else [
+        {"verdict": None, "max_ratio": None, "offending": []} for _ in products
+    ]
+    table, columns = per_100g_table(products)
+    ratios = per_100g_ratios(table, columns, limits)
+
+    ranked = []
+    for index, (product, result) in enumerate(zip(products, results)):
+        facts = compact_product(product, ingredients_chars=0)
+        known = ratios[index][~np.isnan(ratios[index])]
+        ranked.append({
+            "index": index,
+            "name": facts["name"] or f"Product {index + 1}",
+            "score": rank_score(float(known.max()) if known.size else None, facts["grade"], facts["nova"]),
+            "verdict": result["verdict"],
+            "over_limit": [o["nutrient"] for o in result["offending"]],
+            "facts": {k: v for k, v in facts.items() if k != "ingredients"}
+        })
+    ranked.sort(key=lambda r: (-r["score"], r["index"]))
+    return ranked
+
+
+async def rank_products(
+    products: list[dict],
+    disease: str,
+    gender: str = "male",
+    goals: str = "none",
+    allergies: str = "none",
+    top_k: int = 3
+) -> dict:
+    """
+    Ranks any number of products for the user. Every product is scored
+    locally; only the top `top_k` go to the LLM, in one call, for a short
+    personalized explanation, so latency stays flat as the list grows.
+    If the LLM fails the local ranking is still returned, without explanations.
+    """
+    ranking = local_rank(products, disease, gender)
+    top = ranking[:top_k]
+
+    guidelines_text = ""
+    if disease and disease.lower() != "none":
+        limits = limits_summary(get_guideline_index().lookup(disease, gender, categories=PRODUCT_CATEGORIES))
+        if limits:
+            guidelines_text = f"Guideline limits: {limits}"
+
+    candidates = "\n".join(
+        f"{i}. {compact_product(products[r['index']])} (local score {r['score']}, over limit: {', '.join(r['over_limit']) or 'none'})"
+        for i, r in enumerate(top, 1)
+    )
+
+    system_prompt = f"""
+You are Nutrio’s product ranking engine.
+
+User:
+Gender: {gender}
+Condition: {disease if disease and disease.lower() != "none" else "None"}
+Goals: {goals if goals != "none" else "General health"}
+Allergies: {allergies if allergies != "none" else "None"}
+
+{guidelines_text}
+
+The user is choosing between {len(products)} products. These are the top {len(top)} by nutrition score:
+{candidates}
+
+Rules:
+- Keep the given order unless an allergy or goal clearly rules a product out
+- One short reason per product (max 20 words), personalized to the user
+- Recommendation: max 20 words
+
+Return STRICT JSON ONLY in this format:
+{{
+  "ranking": [
+    {{"name": "", "reason": ""}}
+  ],
+  "recommendation": ""
+}}
+""".strip()
+
+    record_usage("rank", system_prompt)
+    explanation = None
+    try:
+        response_text = await llm.generate(system_prompt, json_output=True)
+        explanation = json.loads(response_text)
+    except Exception as e:
+        print(f"Rank Products Error: {e}")
+
+    return {
+        "success": True,
+        "ranking": ranking,
+        "explanation": explanation
+    }
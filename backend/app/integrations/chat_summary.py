@@ -0,0 +1,158 @@
+import os
+from datetime import datetime
+
+from sqlmodel import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import ChatHistory, ChatSummary
+from app.database import async_session
+from app.integrations import llm
+from app.integrations.prompt_builder import estimate_tokens
+
+CHAT_HISTORY_WINDOW = 10
+CHAT_RECENT_TURNS = int(os.getenv("CHAT_RECENT_TURNS", "3"))
+CHAT_SUMMARY_MIN_TURNS = int(os.getenv("CHAT_SUMMARY_MIN_TURNS", "3"))
+CHAT_SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", "250"))
+# Most turns folded into the summary by one LLM call.
+CHAT_SUMMARY_BATCH = int(os.getenv("CHAT_SUMMARY_BATCH", "20"))
+CHAT_HISTORY_TOKENS = int(os.getenv("CHAT_HISTORY_TOKENS", "800"))
+
+_dirty = set()
+_running = set()
+_sizes = {"prompts": 0, "legacy_tokens": 0, "history_tokens": 0}
+
+
+def _truncate(text: str, tokens: int) -> str:
+    limit = tokens * 4
+    return text if len(text) <= limit else text[:limit].rstrip() + "..."
+
+
+def _format_turns(records) -> str:
+    return "".join(f"User: {r.message}\nAI: {r.response}\n" for r in records)
+
+
+async def build_history_context(db: AsyncSession, user_id: int) -> str:
+    """
+    Conversation context for the chat prompt: the user's rolling summary
+    followed by the turns it does not cover yet, newest last. Raw turns are
+    dropped oldest-first to stay within CHAT_HISTORY_TOKENS. Also records
+    how large the old last-10-raw-turns context would have been.
+    """
+    summary = await db.get(ChatSummary, user_id)
+    statement = (
+        select(ChatHistory)
+        .where(ChatHistory.user_id == user_id)
+        .order_by(ChatHistory.timestamp.desc(), ChatHistory.id.desc())
+        .limit(CHAT_HISTORY_WINDOW)
+    )
+    result = await db.exec(statement)
+    records = list(reversed(result.all()))
+
+    legacy_context = _format_turns(records) or "No previous conversation."
+
+    summary_text = ""
+    if summary is not None:
+        summary_text = f"Summary of earlier conversation: {_truncate(summary.summary, CHAT_SUMMARY_TOKENS)}\n"
+        records = [r for r in records if r.id > summary.last_chat_id]
+
+    budget = CHAT_HISTORY_TOKENS - estimate_tokens(summary_text)
+    turns = []
+    for record in reversed(records):
+        turn = _format_turns([record])
+        if turns and estimate_tokens(turn) > budget:
+            break
+        turns.append(turn)
+        budget -= estimate_tokens(turn)
+
+    history_context = summary_text + "".join(reversed(turns))
+    if not history_context:
+        history_context = "No previous conversation."
+
+    _sizes["prompts"] += 1
+    _sizes["legacy_tokens"] += estimate_tokens(legacy_context)
+    _sizes["history_tokens"] += estimate_tokens(history_context)
+    return history_context
+
+
+def _summary_prompt(previous: str, turns: str) -> str:
+    words = int(CHAT_SUMMARY_TOKENS * 0.75)
+    return f"""You maintain a running summary of a conversation between a user and Nutrio's nutrition assistant.
+
+Current summary:
+{previous or 'None yet.'}
+
+New turns to fold in:
+{turns}
+
+Rewrite the summary to include the new turns. Keep facts the assistant will need later:
+the user's questions, foods and products discussed, advice given, and anything the user
+said about their health, preferences or plans. Plain text, under {words} words."""
+
+
+async def _update_once(user_id: int) -> bool:
+    """
+    Folds up to CHAT_SUMMARY_BATCH of the oldest unsummarized turns into the
+    summary. Returns True when more turns may be waiting.
+    """
+    async with async_session() as db:
+        summary = await db.get(ChatSummary, user_id)
+        last_chat_id = summary.last_chat_id if summary is not None else 0
+
+        result = await db.exec(
+            select(ChatHistory)
+            .where(ChatHistory.user_id == user_id, ChatHistory.id > last_chat_id)
+            .order_by(ChatHistory.id.asc())
+            .limit(CHAT_SUMMARY_BATCH + CHAT_RECENT_TURNS)
+        )
+        pending = result.all()
+        # The newest turns stay verbatim in the prompt; only older ones are folded.
+        to_fold = pending[:-CHAT_RECENT_TURNS] if CHAT_RECENT_TURNS else pending
+        if len(to_fold) < CHAT_SUMMARY_MIN_TURNS:
+            return False
+
+        previous = summary.summary if summary is not None else ""
+        text = await llm.generate(_summary_prompt(previous, _format_turns(to_fold)))
+        values = {
+            "summary": _truncate(text.strip(), CHAT_SUMMARY_TOKENS),
+            "last_chat_id": to_fold[-1].id,
+            "updated_at": datetime.now()
+        }
+        statement = insert(ChatSummary).values(user_id=user_id, **values).on_conflict_do_update(
+            index_elements=[ChatSummary.user_id],
+            set_=values
+        )
+        await db.exec(statement)
+        await db.commit()
+    return len(pending) == CHAT_SUMMARY_BATCH + CHAT_RECENT_TURNS
+
+
+async def update_summary(user_id: int) -> None:
+    """
+    Background task run after each chat reply. Replies arriving while an
+    update runs trigger one more pass instead of piling up, as does a
+    backlog longer than one batch.
+    """
+    _dirty.add(user_id)
+    if user_id in _running:
+        return
+    _running.add(user_id)
+    try:
+        while user_id in _dirty:
+            _dirty.discard(user_id)
+            if await _update_once(user_id):
+                _dirty.add(user_id)
+    except Exception as e:
+        print(f"Chat summary update failed for user {user_id}: {e}")
+    finally:
+        _running.discard(user_id)
+
+
+def size_stats() -> dict:
+    prompts = _sizes["prompts"]
+    return {
+        "prompts": prompts,
+        "avg_legacy_history_tokens": round(_sizes["legacy_tokens"] / prompts, 1) if prompts else 0.0,
+        "avg_history_tokens": round(_sizes["history_tokens"] / prompts, 1) if prompts else 0.0,
+        "updating": len(_running)
+    }
@@ -0,0 +1,154 @@
+import os
+import json
+import hashlib
+from datetime import datetime
+
+from fastapi import BackgroundTasks
+from sqlmodel import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import User, Inventory, DashboardSnapshot
+from app.database import async_session
+from app.integrations.user_cache import UserProfile
+from app.schemas.dashboard import DashboardAnalysisResponse
+from app.integrations.app import generate_dashboard_stats, DASHBOARD_FALLBACK
+from app.integrations import intake
+
+DASHBOARD_BACKGROUND_REFRESH = os.getenv("DASHBOARD_BACKGROUND_REFRESH", "0") == "1"
+INTAKE_PROMPT_PERIODS = 6
+
+_dirty = set()
+_running = set()
+
+
+def dashboard_profile(user: User | UserProfile) -> dict:
+    return {
+        "name": user.name,
+        "gender": user.gender,
+        "disease": user.health_issues,
+        "goals": user.goals,
+        "allergies": user.dietary_preferences
+    }
+
+
+def profile_hash(user_profile: dict) -> str:
+    payload = json.dumps(user_profile, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def inventory_hash(db: AsyncSession, user_id: int) -> str:
+    """
+    Content hash of the user's inventory, computed from the key columns only
+    so checking freshness never loads the product_data blobs.
+    """
+    statement = (
+        select(Inventory.barcode, Inventory.timestamp)
+        .where(Inventory.user_id == user_id)
+        .order_by(Inventory.barcode)
+    )
+    result = await db.exec(statement)
+    digest = hashlib.sha256()
+    for barcode, timestamp in result.all():
+        digest.update(f"{barcode}\0{timestamp.isoformat()}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+async def get_snapshot(db: AsyncSession, user_id: int, timeline: str, inv_hash: str, prof_hash: str) -> dict | None:
+    snapshot = await db.get(DashboardSnapshot, (user_id, timeline))
+    if snapshot is None or snapshot.inventory_hash != inv_hash or snapshot.profile_hash != prof_hash:
+        return None
+    return json.loads(snapshot.analysis)
+
+
+async def store_snapshot(db: AsyncSession, user_id: int, timeline: str, inv_hash: str, prof_hash: str, analysis: dict) -> None:
+    values = {
+        "inventory_hash": inv_hash,
+        "profile_hash": prof_hash,
+        "analysis": json.dumps(analysis),
+        "created_at": datetime.now()
+    }
+    statement = insert(DashboardSnapshot).values(
+        user_id=user_id,
+        timeline=timeline,
+        **values
+    ).on_conflict_do_update(
+        index_elements=[DashboardSnapshot.user_id, DashboardSnapshot.timeline],
+        set_=values
+    )
+    await db.exec(statement)
+    await db.commit()
+
+
+def _is_storable(analysis: dict) -> bool:
+    if analysis == DASHBOARD_FALLBACK:
+        return False
+    try:
+        DashboardAnalysisResponse.model_validate(analysis)
+    except Exception:
+        return False
+    return True
+
+
+async def compute_dashboard(db: AsyncSession, user_id: int, user_profile: dict, timeline: str,
+                            inv_hash: str, prof_hash: str) -> dict:
+    """
+    Runs the full dashboard analysis and stores it under the given hashes.
+    Fallback answers are returned but never stored.
+    """
+    result = await db.exec(select(Inventory).where(Inventory.user_id == user_id))
+    inventory_items = result.all()
+
+    period = intake.timeline_period(timeline)
+    buckets = await intake.get_intake(db, user_id, period, periods=INTAKE_PROMPT_PERIODS)
+    intake_context = intake.intake_summary(buckets, period)
+
+    analysis = await generate_dashboard_stats(user_profile, inventory_items, timeline, intake_context)
+    if _is_storable(analysis):
+        await store_snapshot(db, user_id, timeline, inv_hash, prof_hash, analysis)
+    return analysis
+
+
+async def _refresh_once(user_id: int) -> None:
+    async with async_session() as db:
+        user = await db.get(User, user_id)
+        if user is None:
+            return
+        user_profile = dashboard_profile(user)
+        prof_hash = profile_hash(user_profile)
+        inv_hash = await inventory_hash(db, user_id)
+
+        result = await db.exec(select(DashboardSnapshot).where(DashboardSnapshot.user_id == user_id))
+        for snapshot in result.all():
+            if snapshot.inventory_hash == inv_hash and snapshot.profile_hash == prof_hash:
+                continue
+            await compute_dashboard(db, user_id, user_profile, snapshot.timeline, inv_hash, prof_hash)
+
+
+async def refresh_user(user_id: int) -> None:
+    """
+    Recomputes every timeline the user has viewed before, so the next view
+    after an inventory or survey change is already warm. Changes arriving
+    while a refresh runs trigger one more pass instead of piling up.
+    """
+    _dirty.add(user_id)
+    if user_id in _running:
+        return
+    _running.add(user_id)
+    try:
+        while user_id in _dirty:
+            _dirty.discard(user_id)
+            await _refresh_once(user_id)
+    except Exception as e:
+        print(f"Dashboard refresh failed for user {user_id}: {e}")
+    finally:
+        _running.discard(user_id)
+
+
+def schedule_refresh(background_tasks: BackgroundTasks, user_id: int) -> None:
+    """
+    Called after add_to_inventory and submit_survey. A no-op unless
+    DASHBOARD_BACKGROUND_REFRESH=1; otherwise the next view recomputes.
+    """
+    if DASHBOARD_BACKGROUND_REFRESH:
+        background_tasks.add_task(refresh_user, user_id)
@@ -1,8 +1,12 @@
 import json
-import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import chromadb
 from tqdm import tqdm
-from app.integrations.rag_utils import GeminiEmbeddingFunction
+from app.integrations.rag_utils import CHROMA_PATH, EMBED_BATCH_SIZE, ProviderEmbeddingFunction, open_collection
+from app.integrations.embedding_providers import get_embedding_provider
+from app.integrations.ratelimit import TokenBucket
+from app.integrations.guidelines import guideline_text
 
 def create_documents(path):
     with open(path, 'r') as f:
@@ -12,25 +16,7 @@ def create_documents(path):
     metadatas = []
 
     for item in data:
-        parts = []
-
-           
-        if item.get("guideline"):
-            parts.append(f"Guideline: {item['guideline']}")
-        if item.get("condition"):
-            parts.append(f"Condition: {item['condition']}")
-        if item.get("category"):
-            parts.append(f"Category: {item['category']}")
-        if item.get("gender"):
-            parts.append(f"Gender: {item['gender']}")
-        if item.get("per_serving_limit"):
-            parts.append(f"Per serving limit: {item['per_serving_limit']} {item.get('unit', '')}")
-        if item.get("daily_limit"):
-            parts.append(f"Daily limit: {item['daily_limit']} {item.get('unit', '')}")
-        if item.get("source"):
-            parts.append(f"Source: {item['source']}")
-
-        text = ". ".join(parts) + "."
+        text = guideline_text(item)
         documents.append(text)
 
            
@@ -45,33 +31,73 @@ def create_documents(path):
 
     return documents, metadatas
 
-def create_chroma_db(documents, metadatas, name):
-    chroma_client = chromadb.PersistentClient(path="chroma-db/")
-
-    try:
-        chroma_client.delete_collection(name=name)
-        print(f"Deleted existing collection: {name}")
-    except Exception:
-        pass
-
-    db = chroma_client.create_collection(
-        name=name,
-        embedding_function=GeminiEmbeddingFunction()
-    )
-
-    print(f"Creating collection: {name}")
-
-    for i, (doc, meta) in tqdm(
-        enumerate(zip(documents, metadatas)),
-        total=len(documents),
-        desc="Creating Chroma DB"
-    ):
-        db.add(
-            documents=[doc],
-            metadatas=[meta],
-            ids=[str(i)]
-        )
-        time.sleep(0.5)
+def document_id(doc, meta):
+    """
+    Content-hash id: unchanged guidelines keep their id across runs, edited
+    ones get a new one.
+    """
+    payload = json.dumps({"document": doc, "metadata": meta}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def create_chroma_db(documents, metadatas, name, batch_size=EMBED_BATCH_SIZE,
+                     requests_per_minute=60, max_workers=4, rebuild=False, provider=None):
+    """
+    Incrementally syncs `documents` into the collection `name`.
+    Only new or changed documents are embedded, in batches of `batch_size`,
+    with at most `max_workers` requests in flight and a token bucket keeping
+    the request rate under `requests_per_minute`. Documents that no longer
+    exist in the source are removed. Pass rebuild=True to start from scratch,
+    e.g. when switching embedding provider.
+    """
+    chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
+    provider = provider or get_embedding_provider()
+
+    if rebuild:
+        try:
+            chroma_client.delete_collection(name=name)
+            print(f"Deleted existing collection: {name}")
+        except Exception:
+            pass
+
+    embedding_function = ProviderEmbeddingFunction(provider)
+    db = open_collection(chroma_client, name, provider)
+
+    wanted = {}
+    for doc, meta in zip(documents, metadatas):
+        wanted[document_id(doc, meta)] = (doc, meta)
+
+    existing = set(db.get(include=[])["ids"])
+    stale = [doc_id for doc_id in existing if doc_id not in wanted]
+    pending = [doc_id for doc_id in wanted if doc_id not in existing]
+
+    if stale:
+        db.delete(ids=stale)
+        print(f"Removed {len(stale)} stale documents from {name}")
+
+    print(f"Syncing collection: {name} ({len(pending)} new, {len(existing) - len(stale)} unchanged)")
+
+    bucket = TokenBucket(rate=requests_per_minute / 60.0, capacity=max_workers)
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+
+    def embed_batch(ids):
+        if provider.remote:
+            bucket.acquire()
+        return ids, embedding_function([wanted[doc_id][0] for doc_id in ids])
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool, \
+            tqdm(total=len(pending), desc="Creating Chroma DB") as progress:
+        futures = [pool.submit(embed_batch, ids) for ids in batches]
+        for future in as_completed(futures):
+            ids, embeddings = future.result()
+               
+            db.add(
+                ids=ids,
+                documents=[wanted[doc_id][0] for doc_id in ids],
+                metadatas=[wanted[doc_id][1] for doc_id in ids],
+                embeddings=embeddings
+            )
+            progress.update(len(ids))
 
     print(f"Total documents stored: {db.count()}")
     return db
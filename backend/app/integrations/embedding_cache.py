@@ -0,0 +1,105 @@
+import os
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from array import array
+
+from app.integrations.cache import LRUCache
+
+# Defaults to a file next to this module, whatever the working directory.
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "embedding-cache.sqlite3")
+)
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.split()).casefold()
+
+
+def cache_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache for embedding vectors keyed by (model, normalized text).
+    Tier 1 is an in-memory LRU, tier 2 a local SQLite file that survives
+    restarts. Disk hits are promoted into memory.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, maxsize: int = EMBEDDING_CACHE_SIZE):
+        self.memory = LRUCache(maxsize=maxsize)
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self.path = path
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL)"
+            )
+            self._conn.commit()
+
+    def get(self, model: str, text: str):
+        key = cache_key(model, text)
+        vector = self.memory.get(key)
+        if vector is not None:
+            return vector
+
+        if self._conn is not None:
+            with self._lock:
+                row = self._conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self.disk_hits += 1
+            if row is not None:
+                vector = array("d", row[0]).tolist()
+                self.memory.set(key, vector)
+                return vector
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, model: str, text: str, vector) -> None:
+        key = cache_key(model, text)
+        vector = list(vector)
+        self.memory.set(key, vector)
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, model, vector) VALUES (?, ?, ?)",
+                    (key, model, array("d", vector).tobytes())
+                )
+                self._conn.commit()
+
+    def stats(self) -> dict:
+        memory_hits = self.memory.hits
+        with self._lock:
+            disk_hits, misses = self.disk_hits, self.misses
+        total = memory_hits + disk_hits + misses
+        return {
+            "memory_size": len(self.memory),
+            "memory_hits": memory_hits,
+            "disk_hits": disk_hits,
+            "misses": misses,
+            "hit_rate": round((memory_hits + disk_hits) / total, 4) if total else 0.0
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache()
+    return _cache
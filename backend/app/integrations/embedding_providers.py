@@ -0,0 +1,135 @@
+import os
+import re
+import math
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "gemini")
+LOCAL_EMBEDDING_DIM = int(os.getenv("LOCAL_EMBEDDING_DIM", "512"))
+
+
+class EmbeddingProvider(ABC):
+    """
+    Turns a batch of texts into vectors. `name` and `dimension` are recorded
+    on every collection built with the provider so a mismatch is caught
+    before a query returns nonsense. `max_distance` is the squared-L2 cutoff
+    above which a retrieved passage is treated as irrelevant; distances are
+    only comparable within one provider, so each one carries its own.
+    """
+    name = ""
+    dimension = 0
+    batch_size = 100
+    max_distance = 0.8
+       
+    remote = True
+
+    @abstractmethod
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        ...
+
+
+class GeminiEmbeddingProvider(EmbeddingProvider):
+    name = "gemini:text-embedding-004"
+    dimension = 768
+    model = "models/text-embedding-004"
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from google import genai
+                    self._client = genai.Client(api_key=os.getenv("GEMINI_API"))
+        return self._client
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        result = self._get_client().models.embed_content(
+            model=self.model,
+            contents=texts
+        )
+        return [embedding.values for embedding in result.embeddings]
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    In-process CPU embedder using the hashing trick over word unigrams and
+    bigrams (signed, sublinear tf, L2-normalised). No model download and no
+    network, so it answers in microseconds and works offline and in tests.
+    Recall is lexical rather than semantic.
+
+    Vectors are unit length, so distance = 2 - 2 * cosine. Lexical overlap
+    is sparse and shared filler words ("what is the ...") pull unrelated
+    queries closer: against the disease guidelines, the queries the app
+    builds land at 1.69 or below, while the closest off-topic question
+    seen ("what is the meaning of life") sits at 1.72.
+    """
+    batch_size = 1000
+    remote = False
+    max_distance = 1.7
+
+    _token_pattern = re.compile(r"[a-z0-9]+")
+
+    def __init__(self, dimension: int = LOCAL_EMBEDDING_DIM):
+        self.dimension = dimension
+        self.name = f"local:hashing-v1-{dimension}"
+
+    def _features(self, text: str):
+        tokens = self._token_pattern.findall(text.lower())
+        features = list(tokens)
+        features.extend(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+        return features
+
+    def _embed_one(self, text: str) -> list[float]:
+        counts = {}
+        for feature in self._features(text):
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            index = value % self.dimension
+            sign = 1.0 if (value >> 63) & 1 else -1.0
+            counts[index] = counts.get(index, 0.0) + sign
+
+        vector = [0.0] * self.dimension
+        for index, count in counts.items():
+            vector[index] = math.copysign(1.0 + math.log(abs(count)), count) if count else 0.0
+
+        norm = math.sqrt(sum(v * v for v in vector))
+        if norm:
+            vector = [v / norm for v in vector]
+        return vector
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed_one(text) for text in texts]
+
+
+PROVIDERS = {
+    "gemini": GeminiEmbeddingProvider,
+    "local": HashingEmbeddingProvider,
+}
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_embedding_provider(name: str | None = None) -> EmbeddingProvider:
+    """
+    Returns the shared provider instance for `name` (default: the
+    EMBEDDING_PROVIDER environment variable).
+    """
+    name = name or EMBEDDING_PROVIDER
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown embedding provider '{name}'. Choose one of: {', '.join(PROVIDERS)}")
+    provider = _providers.get(name)
+    if provider is None:
+        with _providers_lock:
+            provider = _providers.get(name)
+            if provider is None:
+                provider = PROVIDERS[name]()
+                _providers[name] = provider
+    return provider
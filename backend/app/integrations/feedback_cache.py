@@ -0,0 +1,93 @@
+import os
+import json
+import hashlib
+from datetime import datetime
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import AIFeedbackCache
+from app.integrations.cache import LRUCache
+
+FEEDBACK_CACHE_SIZE = int(os.getenv("FEEDBACK_CACHE_SIZE", "10000"))
+FEEDBACK_CACHE_TTL = float(os.getenv("FEEDBACK_CACHE_TTL", str(6 * 3600)))
+
+_feedback = LRUCache(maxsize=FEEDBACK_CACHE_SIZE, ttl=FEEDBACK_CACHE_TTL)
+
+
+def _normalize(value) -> str:
+    if value is None:
+        return ""
+    value = " ".join(str(value).split()).casefold()
+    return "" if value == "none" else value
+
+
+def profile_fingerprint(health_issues=None, goals=None, dietary_preferences=None, gender=None) -> str:
+    """
+    Hash of the profile fields analyze_nutrition depends on. Users with the
+    same profile share cached feedback, and any survey change produces a
+    new fingerprint, so stale feedback is never served after an update.
+    """
+    payload = json.dumps([
+        _normalize(health_issues),
+        _normalize(goals),
+        _normalize(dietary_preferences),
+        _normalize(gender),
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def product_hash(product: dict) -> str:
+    """
+    Content hash of the product the feedback is about, so feedback written
+    before OpenFoodFacts data changed (e.g. on a background refresh) is
+    never served for the new data.
+    """
+    payload = json.dumps(product, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def get_feedback(db: AsyncSession, barcode: str, fingerprint: str, prompt_version: str,
+                       product_digest: str) -> str | None:
+    """
+    Cached feedback, if it was written for the same product content within
+    FEEDBACK_CACHE_TTL. Both tiers apply the TTL.
+    """
+    key = (barcode, fingerprint, prompt_version)
+    entry = _feedback.get(key)
+    if entry is not None and entry[1] == product_digest:
+        return entry[0]
+
+    row = await db.get(AIFeedbackCache, key)
+    if row is None or row.product_hash != product_digest:
+        return None
+    remaining = FEEDBACK_CACHE_TTL - (datetime.now() - row.created_at).total_seconds()
+    if remaining <= 0:
+        return None
+    _feedback.set(key, (row.feedback, row.product_hash), ttl=remaining)
+    return row.feedback
+
+
+async def store_feedback(db: AsyncSession, barcode: str, fingerprint: str, prompt_version: str,
+                         product_digest: str, feedback: str) -> None:
+    _feedback.set((barcode, fingerprint, prompt_version), (feedback, product_digest))
+    values = {"feedback": feedback, "product_hash": product_digest, "created_at": datetime.now()}
+    statement = insert(AIFeedbackCache).values(
+        barcode=barcode,
+        profile_fingerprint=fingerprint,
+        prompt_version=prompt_version,
+        **values
+    ).on_conflict_do_update(
+        index_elements=[
+            AIFeedbackCache.barcode,
+            AIFeedbackCache.profile_fingerprint,
+            AIFeedbackCache.prompt_version
+        ],
+        set_=values
+    )
+    await db.exec(statement)
+    await db.commit()
+
+
+def cache_stats() -> dict:
+    return _feedback.stats()
@@ -0,0 +1,175 @@
+import os
+import re
+import json
+import threading
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "disease.json")
+
+   
+CONDITION_SYNONYMS = {
+    "diabetes": [
+        "diabetes", "diabetic", "diabeties", "type 1", "type 2", "t1d", "t2d",
+        "prediabetes", "pre-diabetes", "pre diabetes", "high blood sugar",
+        "blood sugar", "insulin resistance", "hyperglycemia"
+    ],
+    "high cholesterol": [
+        "high cholesterol", "cholesterol", "cholestrol", "cholestrole",
+        "hypercholesterolemia", "hyperlipidemia", "dyslipidemia", "high ldl",
+        "ldl", "lipids"
+    ],
+}
+
+   
+PRODUCT_CATEGORIES = {
+    "carbohydrates", "sugar", "fructose", "fat", "fats", "saturated_fat",
+    "trans_fat", "cholesterol", "dietary_cholesterol", "sodium", "fiber",
+    "soluble_fiber", "protein", "processed_meats", "plant_stanols",
+    "phytosterols", "soy_protein",
+}
+
+_split_pattern = re.compile(r"[,;/\n]|\band\b|&|\+")
+
+
+def normalize_conditions(health_issues: str | None) -> list[str]:
+    """
+    Maps a free-text `health_issues` value ("Type 2 diabetic, high LDL")
+    to the canonical condition names used in disease.json.
+    """
+    if not health_issues:
+        return []
+    conditions = []
+    for part in _split_pattern.split(health_issues.lower()):
+        part = " ".join(part.split())
+        if not part or part == "none":
+            continue
+        for condition, synonyms in CONDITION_SYNONYMS.items():
+            if condition not in conditions and any(synonym in part for synonym in synonyms):
+                conditions.append(condition)
+    return conditions
+
+
+def normalize_gender(gender: str | None) -> str | None:
+    if not gender:
+        return None
+    gender = gender.strip().lower()
+    if gender in ("male", "m", "man"):
+        return "male"
+    if gender in ("female", "f", "woman"):
+        return "female"
+    return None
+
+
+def guideline_text(item: dict) -> str:
+    """
+    Renders a disease.json entry the same way it is embedded into Chroma.
+    """
+    parts = []
+
+    if item.get("guideline"):
+        parts.append(f"Guideline: {item['guideline']}")
+    if item.get("condition"):
+        parts.append(f"Condition: {item['condition']}")
+    if item.get("category"):
+        parts.append(f"Category: {item['category']}")
+    if item.get("gender"):
+        parts.append(f"Gender: {item['gender']}")
+    if item.get("per_serving_limit"):
+        parts.append(f"Per serving limit: {item['per_serving_limit']} {item.get('unit', '')}")
+    if item.get("daily_limit"):
+        parts.append(f"Daily limit: {item['daily_limit']} {item.get('unit', '')}")
+    if item.get("source"):
+        parts.append(f"Source: {item['source']}")
+
+    return ". ".join(parts) + "."
+
+
+class GuidelineIndex:
+    """
+    In-memory index of disease.json keyed by (condition, category, gender).
+    Exact lookups replace the fuzzy vector query whenever the user's
+    condition is one we have structured guidelines for.
+    """
+
+    def __init__(self, path: str = DATA_PATH):
+        with open(path, 'r') as f:
+            data = json.load(f)
+
+        self.entries = data
+        self._by_key = {}
+        self._by_condition = {}
+        for item in data:
+            condition = item.get("condition", "").lower()
+            key = (condition, item.get("category", ""), item.get("gender", "both"))
+            self._by_key.setdefault(key, []).append(item)
+            self._by_condition.setdefault(condition, []).append(item)
+
+    def get(self, condition: str, category: str, gender: str = "both") -> list[dict]:
+        return self._by_key.get((condition, category, gender), [])
+
+    def lookup(self, health_issues: str | None, gender: str | None = None, categories=None) -> list[dict]:
+        """
+        Guidelines for every condition found in `health_issues`, limited to
+        entries for the user's gender or "both", optionally to `categories`.
+        """
+        gender = normalize_gender(gender)
+        results = []
+        for condition in normalize_conditions(health_issues):
+            for item in self._by_condition.get(condition, []):
+                if categories is not None and item.get("category") not in categories:
+                    continue
+                item_gender = item.get("gender", "both")
+                if item_gender != "both" and gender is not None and item_gender != gender:
+                    continue
+                results.append(item)
+        return results
+
+    def passages(self, health_issues: str | None, gender: str | None = None, categories=None) -> list[dict]:
+        """
+        Same shape as rag_utils.get_relevant_passages, so prompt code does not
+        care where the guidelines came from.
+        """
+        return [
+            {
+                "id": f"{item.get('condition')}:{item.get('category')}:{item.get('gender', 'both')}:{i}",
+                "content": guideline_text(item),
+                "relevance_score": 0.0,
+                "metadata": {
+                    "condition": item.get("condition", ""),
+                    "category": item.get("category", ""),
+                    "gender": item.get("gender", "both"),
+                    "unit": item.get("unit", ""),
+                    "source": item.get("source", "")
+                }
+            }
+            for i, item in enumerate(self.lookup(health_issues, gender, categories))
+        ]
+
+
+def limits_summary(entries: list[dict]) -> str:
+    """
+    One-line summary of numeric limits, for prompts that need to stay short.
+    """
+    limits = []
+    for item in entries:
+        unit = item.get("unit", "")
+        values = []
+        if item.get("per_serving_limit") is not None:
+            values.append(f"{item['per_serving_limit']} {unit}/serving")
+        if item.get("daily_limit") is not None:
+            values.append(f"{item['daily_limit']} {unit}/day")
+        if values:
+            limits.append(f"{item.get('category')} ({item.get('gender', 'both')}): {', '.join(values)}")
+    return "; ".join(limits)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_guideline_index() -> GuidelineIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = GuidelineIndex()
+    return _index
@@ -0,0 +1,140 @@
+import os
+import time
+import random
+import asyncio
+from urllib.parse import urlsplit
+
+import httpx
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "20"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "5"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.25"))
+
+
+class _HostStats:
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.wait_seconds = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "peak_in_flight": self.peak_in_flight,
+            "requests": self.requests,
+            "retries": self.retries,
+            "errors": self.errors,
+            "avg_wait_ms": round(self.wait_seconds / self.requests * 1000, 2) if self.requests else 0.0
+        }
+
+
+class PooledClient:
+    """
+    Application-wide outbound HTTP client: one keep-alive HTTP/2 pool with
+    connect/read timeouts, a per-host concurrency cap, and retries with full
+    jitter on 5xx responses and transport errors. Only used for idempotent
+    GETs, so retrying is always safe.
+    """
+
+    def __init__(self, max_per_host: int = HTTP_MAX_PER_HOST, retries: int = HTTP_RETRIES):
+        self.max_per_host = max_per_host
+        self.retries = retries
+        self._hosts = {}
+        self._client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE
+            ),
+            timeout=httpx.Timeout(
+                HTTP_READ_TIMEOUT,
+                connect=HTTP_CONNECT_TIMEOUT,
+                pool=HTTP_POOL_TIMEOUT
+            )
+        )
+
+    def _host(self, url: str) -> _HostStats:
+        host = urlsplit(url).netloc
+        stats = self._hosts.get(host)
+        if stats is None:
+            stats = self._hosts[host] = _HostStats(self.max_per_host)
+        return stats
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        host = self._host(url)
+        host.waiting += 1
+        started = time.perf_counter()
+        try:
+            await host.semaphore.acquire()
+        finally:
+            # Also runs when the caller is cancelled while queued.
+            host.waiting -= 1
+        host.wait_seconds += time.perf_counter() - started
+        host.requests += 1
+        host.in_flight += 1
+        host.peak_in_flight = max(host.peak_in_flight, host.in_flight)
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    response = await self._client.get(url, **kwargs)
+                    if response.status_code < 500 or attempt == self.retries:
+                        return response
+                except httpx.TransportError:
+                    if attempt == self.retries:
+                        host.errors += 1
+                        raise
+                host.retries += 1
+                await asyncio.sleep(random.uniform(0, HTTP_RETRY_BACKOFF * (2 ** attempt)))
+        finally:
+            host.in_flight -= 1
+            host.semaphore.release()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "max_connections": HTTP_MAX_CONNECTIONS,
+            "max_keepalive_connections": HTTP_MAX_KEEPALIVE,
+            "max_per_host": self.max_per_host,
+            "hosts": {host: stats.as_dict() for host, stats in self._hosts.items()}
+        }
+
+
+_client = None
+
+
+async def startup() -> PooledClient:
+    global _client
+    if _client is None:
+        _client = PooledClient()
+    return _client
+
+
+async def shutdown() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> PooledClient:
+    """
+    The shared client created in main.lifespan. Created lazily for scripts
+    that never run the lifespan.
+    """
+    global _client
+    if _client is None:
+        _client = PooledClient()
+    return _client
@@ -0,0 +1,242 @@
+import asyncio
+from datetime import date, timedelta
+
+from sqlmodel import select
+from sqlalchemy import delete, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import User, Inventory, NutrientIntake
+from app.database import async_session
+from app.integrations.nutrients import NUTRIENT_COLUMNS, parse_product_data
+from app.integrations.rules import NUTRIENTS, build_limits, score_products
+
+PERIODS = ("day", "week", "month")
+# Pseudo-nutrient counting the products added in a bucket.
+ITEMS = "items"
+
+# Typed Inventory column -> nutrient name used in the aggregates.
+_COLUMN_NUTRIENTS = {column: column.removesuffix("_100g") for column in NUTRIENT_COLUMNS}
+# OpenFoodFacts key of a disease.json limit -> aggregate nutrient, where one exists.
+_LIMIT_NUTRIENTS = {"sugars": "sugars", "sodium": "salt", "fat": "fat", "saturated-fat": "saturated_fat"}
+
+
+def period_start(period: str, day: date) -> date:
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _deltas(items: list[dict], limits: list[dict]) -> dict:
+    """
+    (period, period_start, nutrient) -> [total, count, exceeded] for `items`,
+    each a dict with the typed nutrient columns, product_data and timestamp.
+    An item counts at most once towards a nutrient's `exceeded`.
+    """
+    scores = score_products([
+        product if isinstance(product, dict) else {}
+        for product in (parse_product_data(item["product_data"]) for item in items)
+    ], limits)
+
+    deltas = {}
+    for item, score in zip(items, scores):
+        day = item["timestamp"].date()
+        updates = [(ITEMS, 1.0, 0)]
+        for column, nutrient in _COLUMN_NUTRIENTS.items():
+            if item.get(column) is not None:
+                updates.append((nutrient, item[column], 0))
+        # One count per nutrient, and only for real per-serving excesses:
+        # saturated fat has both a serving and an energy-share limit, and
+        # energy shares and per-100 g fallbacks say nothing about one portion.
+        exceeded = {
+            _LIMIT_NUTRIENTS.get(NUTRIENTS[offending["nutrient"]][0], offending["nutrient"])
+            for offending in score["offending"]
+            if offending["decisive"]
+        }
+        updates.extend((nutrient, None, 1) for nutrient in exceeded)
+
+        for period in PERIODS:
+            start = period_start(period, day)
+            for nutrient, value, exceeded in updates:
+                delta = deltas.setdefault((period, start, nutrient), [0.0, 0, 0])
+                if value is not None:
+                    delta[0] += value
+                    delta[1] += 1
+                delta[2] += exceeded
+    return deltas
+
+
+async def _apply(db: AsyncSession, user_id: int, deltas: dict) -> None:
+    if not deltas:
+        return
+    rows = [
+        {
+            "user_id": user_id,
+            "period": period,
+            "period_start": start,
+            "nutrient": nutrient,
+            "total": total,
+            "count": count,
+            "exceeded": exceeded
+        }
+        for (period, start, nutrient), (total, count, exceeded) in deltas.items()
+    ]
+    statement = insert(NutrientIntake).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[NutrientIntake.user_id, NutrientIntake.period, NutrientIntake.period_start, NutrientIntake.nutrient],
+        set_={
+            "total": NutrientIntake.total + statement.excluded.total,
+            "count": NutrientIntake.count + statement.excluded.count,
+            "exceeded": NutrientIntake.exceeded + statement.excluded.exceeded
+        }
+    )
+    await db.exec(statement)
+
+
+async def _lock_user(db: AsyncSession, user_id: int) -> None:
+    # Serializes incremental updates against a concurrent rebuild for the same user.
+    await db.exec(text("SELECT pg_advisory_xact_lock(:key)").bindparams(key=user_id))
+
+
+async def record_items(db: AsyncSession, user_id: int, items: list[dict],
+                       health_issues: str | None, gender: str | None) -> None:
+    """
+    Adds newly inserted inventory rows to the user's aggregates, inside the
+    caller's transaction (the caller commits).
+    """
+    if not items:
+        return
+    await _lock_user(db, user_id)
+    await _apply(db, user_id, _deltas(items, build_limits(health_issues, gender)))
+
+
+async def rebuild_user(user_id: int, batch_size: int = 500) -> None:
+    """
+    Recomputes a user's aggregates from scratch. Run after a survey change,
+    since exceedance counts depend on the user's conditions and gender.
+    """
+    columns = [getattr(Inventory, column) for column in NUTRIENT_COLUMNS]
+    async with async_session() as db:
+        user = await db.get(User, user_id)
+        if user is None:
+            return
+        limits = build_limits(user.health_issues, user.gender)
+
+        await _lock_user(db, user_id)
+        await db.exec(delete(NutrientIntake).where(NutrientIntake.user_id == user_id))
+
+        after = None
+        while True:
+            statement = (
+                select(Inventory.barcode, Inventory.product_data, Inventory.timestamp, *columns)
+                .where(Inventory.user_id == user_id)
+                .order_by(Inventory.barcode)
+                .limit(batch_size)
+            )
+            if after is not None:
+                statement = statement.where(Inventory.barcode > after)
+            result = await db.exec(statement)
+            rows = [dict(row._mapping) for row in result.all()]
+            if not rows:
+                break
+            await _apply(db, user_id, _deltas(rows, limits))
+            after = rows[-1]["barcode"]
+        await db.commit()
+
+
+async def safe_rebuild_user(user_id: int) -> None:
+    try:
+        await rebuild_user(user_id)
+    except Exception as e:
+        print(f"Nutrient intake rebuild failed for user {user_id}: {e}")
+
+
+async def get_intake(db: AsyncSession, user_id: int, period: str, periods: int) -> list[dict]:
+    """
+    The newest `periods` buckets, newest first, each with per-nutrient
+    total, average, count and exceeded.
+    """
+    starts = (
+        select(NutrientIntake.period_start)
+        .where(NutrientIntake.user_id == user_id, NutrientIntake.period == period)
+        .group_by(NutrientIntake.period_start)
+        .order_by(NutrientIntake.period_start.desc())
+        .limit(periods)
+    )
+    result = await db.exec(
+        select(NutrientIntake)
+        .where(
+            NutrientIntake.user_id == user_id,
+            NutrientIntake.period == period,
+            NutrientIntake.period_start.in_(starts.scalar_subquery())
+        )
+        .order_by(NutrientIntake.period_start.desc(), NutrientIntake.nutrient)
+    )
+
+    buckets = {}
+    for row in result.all():
+        bucket = buckets.setdefault(row.period_start, {"period_start": row.period_start, "items": 0, "nutrients": {}})
+        if row.nutrient == ITEMS:
+            bucket["items"] = row.count
+            continue
+        bucket["nutrients"][row.nutrient] = {
+            "total": round(row.total, 2),
+            "average": round(row.total / row.count, 2) if row.count else None,
+            "count": row.count,
+            "exceeded": row.exceeded
+        }
+    return list(buckets.values())
+
+
+def intake_summary(buckets: list[dict], period: str) -> str:
+    """
+    A few lines for the dashboard prompt describing recent buckets.
+    """
+    if not buckets:
+        return ""
+    lines = [f"Measured intake per {period} (averages are per 100 g of the products added):"]
+    for bucket in buckets:
+        averages = ", ".join(
+            f"{nutrient} {values['average']:g}"
+            for nutrient, values in bucket["nutrients"].items()
+            if values["average"] is not None
+        )
+        exceeded = ", ".join(
+            f"{nutrient} x{values['exceeded']}"
+            for nutrient, values in bucket["nutrients"].items()
+            if values["exceeded"]
+        )
+        line = f"- {bucket['period_start'].isoformat()}: {bucket['items']} products"
+        if averages:
+            line += f" | avg {averages}"
+        if exceeded:
+            line += f" | over limit: {exceeded}"
+        lines.append(line)
+    return "\n".join(lines) + "\n"
+
+
+def timeline_period(timeline: str) -> str:
+    """
+    Bucket size to show the model for a dashboard timeline such as "1 week".
+    """
+    timeline = timeline.lower()
+    if "day" in timeline:
+        return "day"
+    if "week" in timeline:
+        return "week"
+    return "month"
+
+
+async def _rebuild_all() -> int:
+    async with async_session() as db:
+        result = await db.exec(select(User.id))
+        user_ids = result.all()
+    for user_id in user_ids:
+        await rebuild_user(user_id)
+    return len(user_ids)
+
+
+if __name__ == "__main__":
+    print(f"Rebuilt nutrient intake for {asyncio.run(_rebuild_all())} users")
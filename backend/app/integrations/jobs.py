@@ -0,0 +1,279 @@
+import os
+import json
+import uuid
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models import JobRecord
+from app.database import async_session
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+JOB_RESULT_TTL = timedelta(seconds=int(os.getenv("JOB_RESULT_TTL", "3600")))
+JOB_STORE = os.getenv("JOB_STORE", "memory")
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind: str, user_id: int | None, fn, dedupe_key=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.user_id = user_id
+        self.dedupe_key = dedupe_key
+        self.status = PENDING
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now()
+        self.finished_at = None
+        self.fn = fn
+        self.finished = asyncio.Event()
+
+    def as_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "user_id": self.user_id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at
+        }
+
+
+class MemoryJobStore:
+    """
+    Default backend: jobs live only in the manager's own dict.
+    """
+
+    async def save(self, job: Job) -> None:
+        pass
+
+    async def load(self, job_id: str) -> dict | None:
+        return None
+
+    async def purge(self, before: datetime) -> None:
+        pass
+
+
+class SQLJobStore:
+    """
+    Persists job status and results to the JobRecord table so they can be
+    polled from any worker process and survive a restart.
+    """
+
+    async def save(self, job: Job) -> None:
+        values = {
+            "kind": job.kind,
+            "user_id": job.user_id,
+            "status": job.status,
+            "result": json.dumps(job.result, default=str) if job.result is not None else None,
+            "error": job.error,
+            "created_at": job.created_at,
+            "finished_at": job.finished_at
+        }
+        statement = insert(JobRecord).values(id=job.id, **values).on_conflict_do_update(
+            index_elements=[JobRecord.id],
+            set_=values
+        )
+        async with async_session() as db:
+            await db.exec(statement)
+            await db.commit()
+
+    async def load(self, job_id: str) -> dict | None:
+        async with async_session() as db:
+            record = await db.get(JobRecord, job_id)
+        if record is None:
+            return None
+        return {
+            "job_id": record.id,
+            "kind": record.kind,
+            "user_id": record.user_id,
+            "status": record.status,
+            "result": json.loads(record.result) if record.result else None,
+            "error": record.error,
+            "created_at": record.created_at,
+            "finished_at": record.finished_at
+        }
+
+    async def purge(self, before: datetime) -> None:
+        async with async_session() as db:
+            await db.exec(delete(JobRecord).where(JobRecord.finished_at < before))
+            await db.commit()
+
+
+class JobManager:
+    """
+    Bounded in-process worker pool for long-running AI work. Identical jobs
+    that are still pending or running are deduplicated by `dedupe_key`;
+    finished results are kept for `result_ttl`.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, queue_size: int = JOB_QUEUE_SIZE,
+                 result_ttl: timedelta = JOB_RESULT_TTL, store=None):
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self.store = store or MemoryJobStore()
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._jobs = {}
+        self._active = {}
+        self._tasks = []
+
+    async def start(self) -> None:
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker()))
+        self._tasks.append(asyncio.create_task(self._janitor()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, kind: str, user_id: int | None, fn, dedupe_key=None) -> Job:
+        """
+        Queues `fn` (a zero-argument coroutine function). Returns the existing
+        job if an identical one is still pending or running. Raises
+        JobQueueFull when the queue is at capacity.
+        """
+        if dedupe_key is not None:
+            job = self._active.get(dedupe_key)
+            if job is not None:
+                return job
+
+        if self._queue.full():
+            raise JobQueueFull()
+
+        job = Job(kind, user_id, fn, dedupe_key)
+        self._jobs[job.id] = job
+        if dedupe_key is not None:
+            self._active[dedupe_key] = job
+        # Persist PENDING before a worker can see the job, so this write can
+        # never land after the worker's RUNNING/DONE ones.
+        await self.store.save(job)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            # Filled up by another submit while we were saving.
+            job.status = FAILED
+            job.error = "Job queue is full"
+            job.finished_at = datetime.now()
+            job.fn = None
+            if dedupe_key is not None and self._active.get(dedupe_key) is job:
+                del self._active[dedupe_key]
+            job.finished.set()
+            await self.store.save(job)
+            raise JobQueueFull()
+        return job
+
+    async def lookup(self, job_id: str) -> dict | None:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.as_dict()
+        return await self.store.load(job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> dict | None:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            try:
+                await asyncio.wait_for(job.finished.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        return await self.lookup(job_id)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            job.status = RUNNING
+            try:
+                await self.store.save(job)
+                job.result = await job.fn()
+                job.status = DONE
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Job {job.id} ({job.kind}) failed: {e}")
+                job.status = FAILED
+                job.error = str(e)
+            finally:
+                job.finished_at = datetime.now()
+                job.fn = None
+                if job.dedupe_key is not None and self._active.get(job.dedupe_key) is job:
+                    del self._active[job.dedupe_key]
+                job.finished.set()
+                self._queue.task_done()
+            try:
+                await self.store.save(job)
+            except Exception as e:
+                print(f"Job {job.id} could not be persisted: {e}")
+
+    async def purge_expired(self, now: datetime | None = None) -> None:
+        """
+        Drops finished jobs older than `result_ttl`.
+        """
+        cutoff = (now or datetime.now()) - self.result_ttl
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_at is not None and job.finished_at < cutoff:
+                del self._jobs[job_id]
+        try:
+            await self.store.purge(cutoff)
+        except Exception as e:
+            print(f"Job purge failed: {e}")
+
+    async def _janitor(self) -> None:
+        while True:
+            await asyncio.sleep(60)
+            await self.purge_expired()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize(),
+            "active": len(self._active),
+            "retained": len(self._jobs)
+        }
+
+
+_manager = None
+
+
+async def startup() -> JobManager:
+    global _manager
+    if _manager is None:
+        store = SQLJobStore() if JOB_STORE == "postgres" else MemoryJobStore()
+        _manager = JobManager(store=store)
+        await _manager.start()
+    return _manager
+
+
+async def shutdown() -> None:
+    global _manager
+    if _manager is not None:
+        await _manager.stop()
+        _manager = None
+
+
+def stats() -> dict:
+    """
+    Manager stats, or zeros when it is not running (e.g. outside the lifespan).
+    """
+    if _manager is None:
+        return {"workers": 0, "queued": 0, "active": 0, "retained": 0}
+    return _manager.stats()
+
+
+def get_job_manager() -> JobManager:
+    if _manager is None:
+        raise RuntimeError("Job manager is not running; it is started in main.lifespan")
+    return _manager
@@ -0,0 +1,125 @@
+import os
+import asyncio
+import hashlib
+from dotenv import load_dotenv
+from google import genai
+from google.genai.errors import ServerError
+from fastapi import HTTPException, Request
+from app.integrations import singleflight
+
+load_dotenv()
+
+api_key = os.getenv("GEMINI_API")
+client = genai.Client(api_key=api_key)
+
+MODEL = "gemini-2.5-flash"
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_DELAY = float(os.getenv("LLM_RETRY_DELAY", "2"))
+
+
+_flight = singleflight.group("llm")
+
+
+class LLMTimeoutError(Exception):
+    pass
+
+
+def _is_overloaded(error: Exception) -> bool:
+    return '503' in str(error) or 'overloaded' in str(error).lower()
+
+
+async def generate(
+    prompt: str,
+    json_output: bool = False,
+    timeout: float = LLM_TIMEOUT,
+    max_retries: int = LLM_MAX_RETRIES,
+    retry_delay: float = LLM_RETRY_DELAY,
+) -> str:
+    """
+    Awaitable Gemini call. Retries overloaded (503) responses with exponential
+    backoff on asyncio.sleep, so waiting never blocks the event loop.
+    Raises LLMTimeoutError when a single attempt exceeds `timeout` seconds.
+    Identical concurrent prompts share one request; it is cancelled once
+    every caller waiting on it has been cancelled.
+    """
+    key = (MODEL, json_output, hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+    return await _flight.do(key, lambda: _generate(prompt, json_output, timeout, max_retries, retry_delay))
+
+
+async def _generate(prompt, json_output, timeout, max_retries, retry_delay) -> str:
+    config = None
+    if json_output:
+        config = genai.types.GenerateContentConfig(
+            response_mime_type="application/json"
+        )
+
+    for attempt in range(max_retries):
+        try:
+            response = await asyncio.wait_for(
+                client.aio.models.generate_content(
+                    model=MODEL,
+                    contents=prompt,
+                    config=config
+                ),
+                timeout=timeout
+            )
+            return response.text
+        except asyncio.TimeoutError:
+            raise LLMTimeoutError(f"Gemini did not answer within {timeout} seconds")
+        except ServerError as e:
+            if _is_overloaded(e) and attempt < max_retries - 1:
+                wait_time = retry_delay * (2 ** attempt)
+                print(f"Model overloaded. Retrying in {wait_time} seconds... (Attempt {attempt + 1}/{max_retries})")
+                await asyncio.sleep(wait_time)
+                continue
+            raise
+
+
+async def cancel_on_disconnect(request: Request, awaitable, poll_interval: float = 0.5):
+    """
+    Runs `awaitable` while watching the HTTP connection. If the client goes
+    away first, the work is cancelled and a 499 is raised so nothing
+    downstream keeps spending tokens on an answer nobody will read.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client closed request")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+async def stream(prompt: str, timeout: float = LLM_TIMEOUT):
+    """
+    Async generator over Gemini's streaming API, yielding text chunks as they
+    arrive. `timeout` bounds the wait for each chunk rather than the whole
+    answer, so long replies are fine as long as tokens keep flowing.
+    """
+    try:
+        chunks = await asyncio.wait_for(
+            client.aio.models.generate_content_stream(
+                model=MODEL,
+                contents=prompt
+            ),
+            timeout=timeout
+        )
+    except asyncio.TimeoutError:
+        raise LLMTimeoutError(f"Gemini did not start streaming within {timeout} seconds")
+
+    iterator = chunks.__aiter__()
+    while True:
+        try:
+            chunk = await asyncio.wait_for(iterator.__anext__(), timeout=timeout)
+        except StopAsyncIteration:
+            return
+        except asyncio.TimeoutError:
+            raise LLMTimeoutError(f"Gemini stream stalled for {timeout} seconds")
+        if chunk.text:
+            yield chunk.text
@@ -0,0 +1,92 @@
+import json
+import asyncio
+
+from sqlmodel import select
+from sqlalchemy import tuple_
+
+from app.models import Inventory
+from app.database import async_session
+
+# Typed Inventory column -> OpenFoodFacts nutriments key (per 100 g).
+NUTRIENT_COLUMNS = {
+    "sugars_100g": "sugars_100g",
+    "salt_100g": "salt_100g",
+    "fat_100g": "fat_100g",
+    "saturated_fat_100g": "saturated-fat_100g",
+    "proteins_100g": "proteins_100g",
+    "energy_kcal_100g": "energy-kcal_100g",
+}
+GRADES = ("a", "b", "c", "d", "e")
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_product_data(value):
+    """
+    product_data as stored in the JSONB column: the decoded OpenFoodFacts
+    product, or the original text when a client sent something that isn't JSON.
+    """
+    if not isinstance(value, str):
+        return value
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def extract_nutrients(product) -> dict:
+    """
+    Values for the typed Inventory columns, taken from an OpenFoodFacts product.
+    Missing or malformed values come back as None.
+    """
+    product = product if isinstance(product, dict) else {}
+    nutriments = product.get("nutriments") or {}
+    values = {column: _float(nutriments.get(key)) for column, key in NUTRIENT_COLUMNS.items()}
+
+    nova = _float(product.get("nova_group"))
+    values["nova_group"] = int(nova) if nova is not None and 1 <= nova <= 4 else None
+
+    grade = str(product.get("nutrition_grades") or product.get("nutriscore_grade") or "").strip().lower()
+    values["nutrition_grade"] = grade if grade in GRADES else None
+    return values
+
+
+async def backfill(batch_size: int = 500) -> int:
+    """
+    Fills the typed nutrient columns for rows stored before they existed.
+    Walks the table in key order, one committed batch at a time, so it can
+    run against a live database and be safely re-run.
+    """
+    updated = 0
+    after = None
+    async with async_session() as db:
+        while True:
+            statement = (
+                select(Inventory)
+                .order_by(Inventory.user_id, Inventory.barcode)
+                .limit(batch_size)
+            )
+            if after is not None:
+                statement = statement.where(tuple_(Inventory.user_id, Inventory.barcode) > after)
+            result = await db.exec(statement)
+            items = result.all()
+            if not items:
+                return updated
+
+            for item in items:
+                for column, value in extract_nutrients(parse_product_data(item.product_data)).items():
+                    setattr(item, column, value)
+                db.add(item)
+            await db.commit()
+            updated += len(items)
+            after = (items[-1].user_id, items[-1].barcode)
+            db.expunge_all()
+
+
+if __name__ == "__main__":
+    print(f"Backfilled {asyncio.run(backfill())} inventory rows")
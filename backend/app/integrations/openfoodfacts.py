@@ -0,0 +1,207 @@
+import os
+import json
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import ProductCache
+from app.database import async_session
+from app.integrations.cache import LRUCache
+from app.integrations.http_client import PooledClient, get_http_client
+from app.integrations import singleflight
+
+PRODUCT_URL = "https://world.openfoodfacts.net/api/v2/product/{barcode}"
+SEARCH_URL = "https://world.openfoodfacts.org/cgi/search.pl"
+
+PRODUCT_FIELDS = (
+    "product_name,nutrition_grades,nutriments,image_url,code,"
+    "nutrient_levels,serving_size,ingredients_text,nova_group,"
+    "ingredients_analysis_tags,categories_tags,categories"
+)
+SEARCH_FIELDS = "product_name,nutrition_grades,nutriments,image_url,code"
+
+
+PRODUCT_TTL = timedelta(seconds=int(os.getenv("PRODUCT_CACHE_TTL", str(24 * 3600))))
+PRODUCT_MAX_STALE = timedelta(seconds=int(os.getenv("PRODUCT_CACHE_MAX_STALE", str(7 * 24 * 3600))))
+PRODUCT_CACHE_SIZE = int(os.getenv("PRODUCT_CACHE_SIZE", "5000"))
+
+
+_products = LRUCache(maxsize=PRODUCT_CACHE_SIZE)
+_searches = LRUCache(maxsize=PRODUCT_CACHE_SIZE)
+_refreshing = set()
+_background_tasks = set()
+_flight = singleflight.group("openfoodfacts")
+
+
+class ProductNotFound(Exception):
+    pass
+
+
+def _normalize_name(name: str) -> str:
+    return " ".join(name.split()).casefold()
+
+
+async def fetch_product(barcode: str, client: PooledClient | None = None) -> dict | None:
+    return await _flight.do(("product", barcode), lambda: _fetch_product(barcode, client))
+
+
+async def search_product(name: str, client: PooledClient | None = None) -> dict | None:
+    return await _flight.do(("search", _normalize_name(name)), lambda: _search_product(name, client))
+
+
+async def _fetch_product(barcode: str, client: PooledClient | None = None) -> dict | None:
+    client = client or get_http_client()
+    response = await client.get(PRODUCT_URL.format(barcode=barcode), params={"fields": PRODUCT_FIELDS})
+    if response.status_code >= 500:
+        response.raise_for_status()
+    data = response.json()
+    if data.get("status") != 1:
+        return None
+    return data.get("product")
+
+
+async def _search_product(name: str, client: PooledClient | None = None) -> dict | None:
+    client = client or get_http_client()
+    params = {
+        "search_terms": name,
+        "search_simple": 1,
+        "action": "process",
+        "json": 1,
+        "page_size": 1,
+        "fields": SEARCH_FIELDS
+    }
+    response = await client.get(SEARCH_URL, params=params)
+    if response.status_code >= 500:
+        response.raise_for_status()
+    products = response.json().get("products", [])
+    return products[0] if products else None
+
+
+async def _store(db: AsyncSession, barcode: str, product: dict, fetched_at: datetime) -> None:
+    statement = insert(ProductCache).values(
+        barcode=barcode,
+        product_data=json.dumps(product),
+        fetched_at=fetched_at
+    ).on_conflict_do_update(
+        index_elements=[ProductCache.barcode],
+        set_={"product_data": json.dumps(product), "fetched_at": fetched_at}
+    )
+    await db.exec(statement)
+    await db.commit()
+
+
+def _schedule(key, refresh) -> None:
+    """
+    Runs `refresh` in the background unless one is already running for `key`.
+    """
+    if key in _refreshing:
+        return
+    _refreshing.add(key)
+
+    async def run():
+        try:
+            await refresh()
+        except Exception as e:
+            print(f"Product cache refresh failed for {key}: {e}")
+        finally:
+            _refreshing.discard(key)
+
+    task = asyncio.create_task(run())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _refresh_barcode(barcode: str) -> None:
+    product = await fetch_product(barcode)
+    if product is None:
+        return
+    fetched_at = datetime.now()
+    _products.set(barcode, (product, fetched_at))
+    async with async_session() as db:
+        await _store(db, barcode, product, fetched_at)
+
+
+async def get_product(barcode: str, db: AsyncSession) -> dict:
+    """
+    Product for `barcode`, served from memory, then Postgres, then OpenFoodFacts.
+    Entries older than PRODUCT_TTL are still served (stale-while-revalidate)
+    while a background refresh runs; past PRODUCT_MAX_STALE they are refetched
+    inline. Raises ProductNotFound if OpenFoodFacts does not know the barcode.
+    """
+    entry = _products.get(barcode)
+    if entry is None:
+        row = await db.get(ProductCache, barcode)
+        if row is not None:
+            entry = (json.loads(row.product_data), row.fetched_at)
+            _products.set(barcode, entry)
+
+    if entry is not None:
+        product, fetched_at = entry
+        age = datetime.now() - fetched_at
+        if age < PRODUCT_TTL:
+            return product
+        if age < PRODUCT_MAX_STALE:
+            _schedule(("barcode", barcode), lambda: _refresh_barcode(barcode))
+            return product
+
+    try:
+        product = await fetch_product(barcode)
+    except httpx.HTTPError:
+        if entry is not None:
+            return entry[0]
+        raise
+
+    if product is None:
+        raise ProductNotFound(barcode)
+
+    fetched_at = datetime.now()
+    _products.set(barcode, (product, fetched_at))
+    await _store(db, barcode, product, fetched_at)
+    return product
+
+
+async def _refresh_search(key: str, name: str) -> None:
+    product = await search_product(name)
+    if product is not None:
+        _searches.set(key, (product, datetime.now()))
+
+
+async def find_product(name: str) -> dict:
+    """
+    First search.pl hit for `name`, cached in-process with the same
+    freshness rules as get_product. Raises ProductNotFound on no match.
+    """
+    key = _normalize_name(name)
+    entry = _searches.get(key)
+    if entry is not None:
+        product, fetched_at = entry
+        age = datetime.now() - fetched_at
+        if age < PRODUCT_TTL:
+            return product
+        if age < PRODUCT_MAX_STALE:
+            _schedule(("search", key), lambda: _refresh_search(key, name))
+            return product
+
+    try:
+        product = await search_product(name)
+    except httpx.HTTPError:
+        if entry is not None:
+            return entry[0]
+        raise
+
+    if product is None:
+        raise ProductNotFound(name)
+
+    _searches.set(key, (product, datetime.now()))
+    return product
+
+
+def cache_stats() -> dict:
+    return {
+        "products": _products.stats(),
+        "searches": _searches.stats(),
+        "refreshing": len(_refreshing)
+    }
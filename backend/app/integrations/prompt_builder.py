@@ -0,0 +1,159 @@
+import os
+import re
+
+from app.integrations.nutrients import GRADES, NUTRIENT_COLUMNS, extract_nutrients, parse_product_data
+
+DASHBOARD_PROMPT_TOKENS = int(os.getenv("DASHBOARD_PROMPT_TOKENS", "1500"))
+
+_GRADE_RANK = {"e": 0, "d": 1, "c": 2, "b": 3, "a": 4}
+_LABELS = {
+    "sugars_100g": ("sugars", "g"),
+    "salt_100g": ("salt", "g"),
+    "fat_100g": ("fat", "g"),
+    "saturated_fat_100g": ("sat fat", "g"),
+    "proteins_100g": ("protein", "g"),
+    "energy_kcal_100g": ("energy", " kcal"),
+}
+_usage = {}
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for English prompts.
+    return (len(text) + 3) // 4
+
+
+def compact_product(p: dict, ingredients_chars: int = 150) -> dict:
+    """
+    The fields the comparison and dashboard prompts actually use.
+    """
+    n = p.get("nutriments") or {}
+    return {
+        "name": p.get("product_name"),
+        "grade": p.get("nutrition_grades"),
+        "nova": p.get("nova_group"),
+        "sugar": n.get("sugars_100g"),
+        "fat": n.get("fat_100g"),
+        "salt": n.get("salt_100g"),
+        "protein": n.get("proteins_100g"),
+        "ingredients": (p.get("ingredients_text") or "")[:ingredients_chars]
+    }
+
+
+def _item_facts(item) -> dict:
+    facts = {column: getattr(item, column, None) for column in (*NUTRIENT_COLUMNS, "nova_group", "nutrition_grade")}
+    if all(value is None for value in facts.values()):
+        # Row predates the typed columns; read the same fields from product_data.
+        facts = extract_nutrients(parse_product_data(getattr(item, "product_data", None)))
+    if facts["nutrition_grade"] is None:
+        score = str(getattr(item, "nutrient_score", "") or "").strip().lower()
+        facts["nutrition_grade"] = score if score in GRADES else None
+    facts["name"] = getattr(item, "title", None) or "Unknown Product"
+    facts["barcode"] = getattr(item, "barcode", "")
+    return facts
+
+
+def _dedupe_key(facts: dict) -> tuple:
+    name = " ".join(re.findall(r"\w+", facts["name"].casefold()))
+    return (name, facts["nutrition_grade"])
+
+
+def _priority(facts: dict) -> tuple:
+    """
+    Most health-relevant first: worst Nutri-Score, then most processed, then
+    highest sugar + salt. Name and barcode make the order fully deterministic.
+    """
+    return (
+        _GRADE_RANK.get(facts["nutrition_grade"], 5),
+        -(facts["nova_group"] or 0),
+        -((facts["sugars_100g"] or 0) + (facts["salt_100g"] or 0)),
+        facts["name"].casefold(),
+        facts["barcode"]
+    )
+
+
+def _item_line(facts: dict, count: int) -> str:
+    line = f"- {facts['name']}"
+    if count > 1:
+        line += f" (x{count})"
+    if facts["nutrition_grade"]:
+        line += f" | Nutri-Score {facts['nutrition_grade'].upper()}"
+    if facts["nova_group"]:
+        line += f" | NOVA {facts['nova_group']}"
+    values = [
+        f"{label} {facts[column]:g}{unit}"
+        for column, (label, unit) in _LABELS.items()
+        if facts[column] is not None
+    ]
+    if values:
+        line += " | per 100 g: " + ", ".join(values)
+    return line + "\n"
+
+
+def build_inventory_context(items: list, budget: int = DASHBOARD_PROMPT_TOKENS) -> tuple[str, dict]:
+    """
+    Compact, de-duplicated inventory listing for the dashboard prompt that
+    fits in `budget` tokens. Items with the same name and grade collapse
+    into one line with a count; when the budget runs out the lowest-priority
+    items are dropped and summarized in a final line. Returns the text and
+    a usage dict (items, unique, included, tokens, budget).
+    """
+    groups = {}
+    for item in items:
+        facts = _item_facts(item)
+        key = _dedupe_key(facts)
+        if key in groups:
+            groups[key][1] += 1
+        else:
+            groups[key] = [facts, 1]
+
+    ranked = sorted(groups.values(), key=lambda group: _priority(group[0]))
+
+    header = "User's Current Dietary Intake (based on Inventory Data):\n"
+    lines = [header]
+    used = estimate_tokens(header)
+    for facts, count in ranked:
+        line = _item_line(facts, count)
+        if used + estimate_tokens(line) > budget:
+            break
+        lines.append(line)
+        used += estimate_tokens(line)
+
+    omitted = len(ranked) - (len(lines) - 1)
+    while omitted:
+        footer = f"- ...and {omitted} lower-priority items (omitted for length)\n"
+        if used + estimate_tokens(footer) <= budget or len(lines) == 1:
+            lines.append(footer)
+            used += estimate_tokens(footer)
+            break
+        # Make room for the footer by dropping the last kept item.
+        used -= estimate_tokens(lines.pop())
+        omitted += 1
+    included = len(ranked) - omitted
+
+    return "".join(lines), {
+        "items": len(items),
+        "unique": len(ranked),
+        "included": included,
+        "tokens": used,
+        "budget": budget
+    }
+
+
+def record_usage(engine: str, prompt: str) -> int:
+    """
+    Counts the estimated tokens of one `engine` prompt for /v1/metrics.
+    """
+    tokens = estimate_tokens(prompt)
+    usage = _usage.setdefault(engine, {"requests": 0, "total_tokens": 0, "max_tokens": 0, "last_tokens": 0})
+    usage["requests"] += 1
+    usage["total_tokens"] += tokens
+    usage["max_tokens"] = max(usage["max_tokens"], tokens)
+    usage["last_tokens"] = tokens
+    return tokens
+
+
+def usage_stats() -> dict:
+    return {
+        engine: {**usage, "avg_tokens": round(usage["total_tokens"] / usage["requests"], 1)}
+        for engine, usage in _usage.items()
+    }
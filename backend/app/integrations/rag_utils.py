@@ -1,31 +1,139 @@
 import os
+import threading
 from dotenv import load_dotenv
 import pandas as pd
 import chromadb
-from google import genai
 from chromadb import Documents, EmbeddingFunction, Embeddings
+from app.integrations.embedding_cache import get_embedding_cache, cache_key
+from app.integrations import singleflight
+from app.integrations.embedding_providers import EmbeddingProvider, GeminiEmbeddingProvider, get_embedding_provider
 
 load_dotenv()
 
-api_key= os.getenv("GEMINI_API")
-client = genai.Client(api_key=api_key)
+# Defaults to the store shipped next to this module, whatever the working directory.
+CHROMA_PATH = os.getenv("CHROMA_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "chroma-db"))
 
+   
+   
+_chroma_lock = threading.Lock()
+_chroma_client = None
+_collections = {}
+
+   
+EMBED_BATCH_SIZE = 100
+# Overrides the provider's own relevance cutoff when set.
+RAG_MAX_DISTANCE = os.getenv("RAG_MAX_DISTANCE")
+
+
+_flight = singleflight.group("embeddings", threaded=True)
+
+
+class EmbeddingProviderMismatch(RuntimeError):
+    pass
+
+
+class ProviderEmbeddingFunction(EmbeddingFunction):
+    """
+    Chroma embedding function backed by an EmbeddingProvider. Query
+    embeddings go through the query-embedding cache for providers that make
+    remote calls; document embeddings from ingestion bypass it, so the
+    cache only ever holds queries.
+    """
+    def __init__(self, provider: EmbeddingProvider | None = None):
+        self.provider = provider or get_embedding_provider()
 
-class GeminiEmbeddingFunction(EmbeddingFunction):
-    def __init__(self):
-        pass
-    
     def __call__(self, input: Documents) -> Embeddings:
+        provider = self.provider
         embeddings = []
-        for text in input:
-            result = client.models.embed_content(
-                model='models/text-embedding-004',
-                contents=text
-            )
-            embeddings.append(result.embeddings[0].values)
+        for start in range(0, len(input), provider.batch_size):
+            embeddings.extend(provider.embed(list(input[start:start + provider.batch_size])))
         return embeddings
 
-def get_relevant_passages(db, query, n_results=5, max_distance=0.8):
+    def embed_query(self, input: Documents) -> Embeddings:
+        provider = self.provider
+        if not provider.remote:
+            return self(input)
+
+        cache = get_embedding_cache()
+        embeddings = [cache.get(provider.name, text) for text in input]
+        missing = [i for i, vector in enumerate(embeddings) if vector is None]
+
+           
+        batch_size = min(provider.batch_size, EMBED_BATCH_SIZE)
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            texts = [input[i] for i in batch]
+               
+            key = (provider.name,) + tuple(cache_key(provider.name, text) for text in texts)
+            vectors = _flight.do(key, lambda: provider.embed(texts))
+            for i, vector in zip(batch, vectors):
+                embeddings[i] = vector
+                cache.set(provider.name, input[i], vector)
+        return embeddings
+
+
+class GeminiEmbeddingFunction(ProviderEmbeddingFunction):
+    def __init__(self):
+        super().__init__(get_embedding_provider("gemini"))
+
+
+def provider_metadata(provider: EmbeddingProvider) -> dict:
+    return {
+        "embedding_provider": provider.name,
+        "embedding_dimension": provider.dimension
+    }
+
+
+def check_provider(collection, provider: EmbeddingProvider) -> None:
+    """
+    Raises EmbeddingProviderMismatch if `collection` was built with a
+    different provider or dimension. Collections created before providers
+    were recorded are treated as Gemini-built.
+    """
+    metadata = collection.metadata or {}
+    built_with = metadata.get("embedding_provider", GeminiEmbeddingProvider.name)
+    dimension = metadata.get("embedding_dimension", GeminiEmbeddingProvider.dimension)
+    if built_with != provider.name or dimension != provider.dimension:
+        raise EmbeddingProviderMismatch(
+            f"Collection '{collection.name}' was built with {built_with} ({dimension} dims) "
+            f"but the configured provider is {provider.name} ({provider.dimension} dims). "
+            f"Re-ingest it or set EMBEDDING_PROVIDER/CHROMA_PATH accordingly."
+        )
+
+
+def open_collection(chroma_client, name, provider: EmbeddingProvider | None = None, create=True):
+    """
+    Opens `name`, creating it (tagged with the provider) when `create` is set,
+    and verifies it matches the provider.
+    """
+    provider = provider or get_embedding_provider()
+    embedding_function = ProviderEmbeddingFunction(provider)
+    try:
+        collection = chroma_client.get_collection(name=name, embedding_function=embedding_function)
+    except Exception:
+        if not create:
+            raise
+        collection = chroma_client.create_collection(
+            name=name,
+            embedding_function=embedding_function,
+            metadata=provider_metadata(provider)
+        )
+    check_provider(collection, provider)
+    return collection
+
+def retrieval_cutoff() -> float:
+    """
+    Distance cutoff for the configured provider. Collections are checked
+    against that provider when opened, so its scale applies to them.
+    """
+    if RAG_MAX_DISTANCE:
+        return float(RAG_MAX_DISTANCE)
+    return get_embedding_provider().max_distance
+
+
+def get_relevant_passages(db, query, n_results=5, max_distance=None):
+    if max_distance is None:
+        max_distance = retrieval_cutoff()
     results = db.query(
         query_texts=[query],
         n_results=n_results
@@ -49,9 +157,54 @@ def get_relevant_passages(db, query, n_results=5, max_distance=0.8):
     return passages
 
 
+def get_chroma_client():
+    """
+    Returns the process-wide PersistentClient, creating it on first use.
+    """
+    global _chroma_client
+    if _chroma_client is None:
+        with _chroma_lock:
+            if _chroma_client is None:
+                _chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
+    return _chroma_client
+
+
 def get_chroma_db(name):
-    chroma_client = chromadb.PersistentClient(path="chroma-db/")
-    return chroma_client.get_or_create_collection(name=name, embedding_function=GeminiEmbeddingFunction())
+    """
+    Returns the shared collection handle for `name`. Collections are opened
+    once per process and reused by every request.
+    """
+    collection = _collections.get(name)
+    if collection is not None:
+        return collection
+
+    chroma_client = get_chroma_client()
+    with _chroma_lock:
+        collection = _collections.get(name)
+        if collection is None:
+            collection = open_collection(chroma_client, name)
+            _collections[name] = collection
+    return collection
+
+
+def check_collections(names):
+    """
+    Startup health check: every collection in `names` must already exist and
+    hold documents. Raises RuntimeError instead of silently creating an
+    empty collection the way get_or_create would.
+    """
+    chroma_client = get_chroma_client()
+    for name in names:
+        try:
+            collection = open_collection(chroma_client, name, create=False)
+        except EmbeddingProviderMismatch:
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Chroma collection '{name}' is missing under {CHROMA_PATH}: {e}") from e
+        if collection.count() == 0:
+            raise RuntimeError(f"Chroma collection '{name}' under {CHROMA_PATH} is empty")
+        with _chroma_lock:
+            _collections.setdefault(name, collection)
 
 if __name__== "__main__":
     db = get_chroma_db("disease-guidelines")
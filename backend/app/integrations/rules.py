@@ -0,0 +1,297 @@
+import json
+import numpy as np
+
+from app.integrations.guidelines import get_guideline_index
+
+   
+   
+   
+NUTRIENTS = {
+    "carbohydrates": ("carbohydrates", "g", 1.0, 4.0),
+    "sugar": ("sugars", "g", 1.0, 4.0),
+    "fructose": ("fructose", "% energy", 1.0, 4.0),
+    "fat": ("fat", "% energy", 1.0, 9.0),
+    "fats": ("fat", "% energy", 1.0, 9.0),
+    "saturated_fat": ("saturated-fat", None, 1.0, 9.0),
+    "trans_fat": ("trans-fat", "% energy", 1.0, 9.0),
+    "cholesterol": ("cholesterol", "mg", 1000.0, 0.0),
+    "dietary_cholesterol": ("cholesterol", "mg", 1000.0, 0.0),
+    "sodium": ("sodium", "mg", 1000.0, 0.0),
+}
+
+   
+   
+SAFE_RATIO = 0.5
+AVOID_RATIO = 1.5
+   
+MIN_KNOWN_LIMITS = 2
+# Share of a daily limit allowed in one serving when the guideline gives no
+# positive per-serving limit (roughly three meals and two snacks a day).
+SERVING_SHARE_OF_DAILY = 0.2
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def build_limits(health_issues: str | None, gender: str | None = None) -> list[dict]:
+    """
+    Numeric upper limits from disease.json that can be checked against
+    OpenFoodFacts nutriments. Mass limits are per serving: the guideline's
+    per-serving limit when it gives a positive one, otherwise
+    SERVING_SHARE_OF_DAILY of the daily limit. "% energy" limits are compared
+    with the product's energy share.
+    """
+    limits = {}
+    for item in get_guideline_index().lookup(health_issues, gender):
+        mapping = NUTRIENTS.get(item.get("category"))
+        if mapping is None:
+            continue
+        key, unit, factor, kcal_per_g = mapping
+        if unit is not None and item.get("unit") != unit:
+            continue
+
+        if item.get("unit") == "% energy":
+            threshold = item.get("daily_limit")
+            basis = "energy"
+        else:
+               
+            threshold = item.get("per_serving_limit")
+            if not threshold and item.get("daily_limit"):
+                threshold = item["daily_limit"] * SERVING_SHARE_OF_DAILY
+            basis = "serving"
+        if not threshold:
+            continue
+
+           
+        current = limits.get((key, basis))
+        if current is not None and current["threshold"] <= threshold:
+            continue
+        limits[(key, basis)] = {
+            "category": item["category"],
+            "condition": item["condition"],
+            "key": key,
+            "basis": basis,
+            "threshold": float(threshold),
+            "unit": item.get("unit", ""),
+            "factor": factor,
+            "kcal_per_g": kcal_per_g,
+        }
+    return list(limits.values())
+
+
+def _values(product: dict, limits: list[dict]) -> tuple[list[float], list[bool]]:
+    """
+    Values to compare with `limits`, plus whether each per-serving value had
+    to fall back to the product's per-100 g figure.
+    """
+    nutriments = product.get("nutriments") or {}
+    energy = _number(nutriments.get("energy-kcal_100g"))
+    if np.isnan(energy):
+        energy = _number(nutriments.get("energy_100g")) / 4.184
+
+    values = []
+    per_100g = []
+    for limit in limits:
+        key = limit["key"]
+        if limit["basis"] == "energy":
+            grams = _number(nutriments.get(f"{key}_100g"))
+            values.append(grams * limit["kcal_per_g"] / energy * 100 if energy and energy > 0 else np.nan)
+            per_100g.append(False)
+        else:
+            value = _number(nutriments.get(f"{key}_serving"))
+            fallback = np.isnan(value)
+            if fallback:
+                value = _number(nutriments.get(f"{key}_100g"))
+            values.append(value * limit["factor"])
+            per_100g.append(bool(fallback and not np.isnan(value)))
+    return values, per_100g
+
+
+def score_products(products: list[dict], limits: list[dict]) -> list[dict]:
+    """
+    Scores every product against `limits` in one vectorized pass.
+    Each result has a verdict (Safe/Moderate/Avoid), whether it is clear-cut
+    enough to skip the LLM, and the nutrients at or over their limit.
+
+    Only per-serving limits checked against real per-serving values can make
+    a verdict clear-cut. "% energy" limits describe a whole diet, not one
+    food (olive oil is all fat), and per-100 g fallbacks say nothing about
+    the portion, so both can push a product towards the LLM but never past
+    it.
+    """
+    if not products:
+        return []
+    if not limits:
+        return [
+            {"verdict": None, "clear_cut": False, "max_ratio": None, "offending": []}
+            for _ in products
+        ]
+
+    rows = [_values(p, limits) for p in products]
+    values = np.array([row[0] for row in rows], dtype=float)
+    per_100g = np.array([row[1] for row in rows], dtype=bool)
+    thresholds = np.array([limit["threshold"] for limit in limits], dtype=float)
+    per_serving = np.array([limit["basis"] == "serving" for limit in limits], dtype=bool)
+    ratios = values / thresholds
+
+    known = ~np.isnan(ratios)
+    known_count = known.sum(axis=1)
+    filled = np.where(known, ratios, -np.inf)
+    max_ratio = filled.max(axis=1)
+
+    decisive = known & per_serving & ~per_100g
+    decisive_max = np.where(decisive, ratios, -np.inf).max(axis=1)
+
+    verdicts = np.where(max_ratio >= 1.0, "Avoid", np.where(max_ratio > SAFE_RATIO, "Moderate", "Safe"))
+    clear_avoid = decisive_max >= AVOID_RATIO
+    clear_safe = (
+        (max_ratio <= SAFE_RATIO)
+        & (decisive.sum(axis=1) >= MIN_KNOWN_LIMITS)
+        & ~(known & per_100g).any(axis=1)
+    )
+    clear_cut = clear_avoid | clear_safe
+    over = known & (ratios >= 1.0)
+
+    results = []
+    for i in range(len(products)):
+        if known_count[i] == 0:
+            results.append({"verdict": None, "clear_cut": False, "max_ratio": None, "offending": []})
+            continue
+        offending = [
+            {
+                "nutrient": limits[j]["category"],
+                "condition": limits[j]["condition"],
+                "value": round(float(values[i, j]), 2),
+                "limit": limits[j]["threshold"],
+                "unit": limits[j]["unit"],
+                "ratio": round(float(ratios[i, j]), 2),
+                "decisive": bool(decisive[i, j]),
+            }
+            for j in np.flatnonzero(over[i])
+        ]
+        offending.sort(key=lambda o: o["ratio"], reverse=True)
+        results.append({
+            "verdict": str(verdicts[i]),
+            "clear_cut": bool(clear_cut[i]),
+            "max_ratio": round(float(max_ratio[i]), 2),
+            "offending": offending,
+        })
+    return results
+
+
+def per_100g_table(products: list[dict]) -> tuple[np.ndarray, dict]:
+    """
+    Per-100 g values of every nutrient a limit can use, one row per product,
+    plus the column of each OpenFoodFacts key ("energy-kcal" included).
+    """
+    keys = sorted({mapping[0] for mapping in NUTRIENTS.values()}) + ["energy-kcal"]
+    table = np.full((len(products), len(keys)), np.nan)
+    for i, product in enumerate(products):
+        nutriments = product.get("nutriments") or {}
+        table[i] = [_number(nutriments.get(f"{key}_100g")) for key in keys]
+        if np.isnan(table[i, -1]):
+            table[i, -1] = _number(nutriments.get("energy_100g")) / 4.184
+    return table, {key: j for j, key in enumerate(keys)}
+
+
+def per_100g_ratios(table: np.ndarray, columns: dict, limits: list[dict]) -> np.ndarray:
+    """
+    Ratio of each product's per-100 g value to each limit, NaN where unknown.
+    Every product is measured on the same basis, so the ratios can rank
+    products against each other; they are not verdicts (a per-serving limit
+    is compared with 100 g), which is what score_products is for.
+    """
+    def column(key):
+        if key in columns:
+            return table[:, columns[key]]
+        if key == "sodium" and "salt" in columns:
+            # OpenFoodFacts derives one from the other: salt = sodium * 2.5.
+            return table[:, columns["salt"]] / 2.5
+        return np.full(len(table), np.nan)
+
+    energy = column("energy-kcal")
+    ratios = np.full((len(table), len(limits)), np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for j, limit in enumerate(limits):
+            grams = column(limit["key"])
+            if limit["basis"] == "energy":
+                values = np.where(energy > 0, grams * limit["kcal_per_g"] / energy * 100, np.nan)
+            else:
+                values = grams * limit["factor"]
+            ratios[:, j] = values / limit["threshold"]
+    return ratios
+
+
+def score_product(product: dict, health_issues: str | None, gender: str | None = None) -> dict:
+    return score_products([product], build_limits(health_issues, gender))[0]
+
+
+def score_inventory(items: list, health_issues: str | None, gender: str | None = None) -> list[dict]:
+    """
+    Batch mode: scores Inventory rows (product_data holds the OpenFoodFacts
+    product, decoded from JSONB or as JSON text) in a single vectorized pass.
+    """
+    products = []
+    for item in items:
+        product = getattr(item, 'product_data', None) or {}
+        if isinstance(product, str):
+            try:
+                product = json.loads(product)
+            except ValueError:
+                product = {}
+        products.append(product if isinstance(product, dict) else {})
+    return score_products(products, build_limits(health_issues, gender))
+
+
+def inventory_summary(items: list, health_issues: str | None, gender: str | None = None,
+                      max_names: int = 5) -> str:
+    """
+    Guideline check of a whole inventory for the dashboard prompt, scored
+    with score_inventory in one pass. Empty when the condition has no
+    numeric limits.
+    """
+    results = score_inventory(items, health_issues, gender)
+    scored = [(item, result) for item, result in zip(items, results) if result["verdict"] is not None]
+    if not scored:
+        return ""
+
+    counts = {verdict: 0 for verdict in ("Avoid", "Moderate", "Safe")}
+    for _, result in scored:
+        counts[result["verdict"]] += 1
+    text = (
+        f"Guideline check against {health_issues} limits ({len(scored)} of {len(items)} items scored): "
+        f"{counts['Avoid']} over a limit, {counts['Moderate']} close to one, {counts['Safe']} within them.\n"
+    )
+
+    over = [(item, result) for item, result in scored if result["verdict"] == "Avoid"]
+    over.sort(key=lambda pair: pair[1]["max_ratio"], reverse=True)
+    for item, result in over[:max_names]:
+        nutrients = ", ".join(o["nutrient"].replace("_", " ") for o in result["offending"][:3])
+        text += f"- {getattr(item, 'title', None) or 'Unknown Product'}: {nutrients}\n"
+    return text
+
+
+def verdict_text(result: dict) -> str:
+    """
+    Short, deterministic feedback for a clear-cut verdict.
+    """
+    if result["verdict"] == "Avoid":
+        offending = [o for o in result["offending"] if o["decisive"]]
+        worst = offending[0]
+        details = ", ".join(
+            f"{o['nutrient'].replace('_', ' ')} ({o['value']:g} vs {o['limit']:g} {o['unit']})"
+            for o in offending[:3]
+        )
+        return (
+            f"Avoid. This product is well over the {worst['condition']} limits for {details}. "
+            f"It is best left out of your diet; a lower-{worst['nutrient'].replace('_', ' ')} "
+            f"alternative would suit you better."
+        )
+    return (
+        "Safe. This product stays comfortably within your limits for the nutrients we track. "
+        "Enjoy it in normal portions as part of a balanced diet."
+    )
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical async calls: while a call for `key` is in
+    flight, later callers await the same task instead of starting their own.
+    The shared task is cancelled only when every waiter has gone away, so
+    one client disconnecting does not fail the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.coalesced = 0
+        self._inflight = {}
+
+    async def do(self, key, fn):
+        entry = self._inflight.get(key)
+        if entry is None:
+            task = asyncio.ensure_future(fn())
+            entry = {"task": task, "waiters": 0}
+            self._inflight[key] = entry
+            task.add_done_callback(lambda _: self._forget(key, entry))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+
+        entry["waiters"] += 1
+        try:
+            return await asyncio.shield(entry["task"])
+        finally:
+            entry["waiters"] -= 1
+            if entry["waiters"] == 0 and not entry["task"].done():
+                # Forget first so a caller arriving before the done-callback
+                # runs starts a fresh call instead of joining a cancelled one.
+                self._forget(key, entry)
+                entry["task"].cancel()
+
+    def _forget(self, key, entry) -> None:
+        if self._inflight.get(key) is entry:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._inflight)}
+
+
+class ThreadSingleFlight:
+    """
+    Same idea for blocking code running in worker threads (embedding calls).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.coalesced = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._inflight)}
+
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+def group(name: str, threaded: bool = False):
+    """
+    Named, process-wide coalescing group. Use threaded=True for blocking code.
+    """
+    with _groups_lock:
+        flight = _groups.get(name)
+        if flight is None:
+            flight = _groups[name] = ThreadSingleFlight(name) if threaded else SingleFlight(name)
+    return flight
+
+
+def stats() -> dict:
+    return {name: flight.stats() for name, flight in _groups.items()}
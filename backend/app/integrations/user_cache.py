@@ -0,0 +1,90 @@
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from app.models import User
+from app.integrations.cache import LRUCache
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
+
+_tokens = LRUCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+_profiles = LRUCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+
+@dataclass(frozen=True)
+class UserProfile:
+    """
+    Read-only snapshot of a user row (without the password hash). Safe to
+    share between requests; handlers that need to modify the user must use
+    get_current_user and its session-bound User instead.
+    """
+    id: int
+    name: str
+    email: str
+    gender: Optional[str] = None
+    health_issues: Optional[str] = None
+    dietary_preferences: Optional[str] = None
+    goals: Optional[str] = None
+    weight: Optional[int] = None
+    height: Optional[int] = None
+    health_details: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserProfile":
+        return cls(
+            id=user.id,
+            name=user.name,
+            email=user.email,
+            gender=user.gender,
+            health_issues=user.health_issues,
+            dietary_preferences=user.dietary_preferences,
+            goals=user.goals,
+            weight=user.weight,
+            height=user.height,
+            health_details=user.health_details,
+            created_at=user.created_at
+        )
+
+
+def get_token(token: str) -> int | None:
+    return _tokens.get(token)
+
+
+def store_token(token: str, user_id: int, expires_at: float | None = None) -> None:
+    """
+    Remembers a verified token -> user id, never beyond the token's own `exp`.
+    """
+    ttl = USER_CACHE_TTL
+    if expires_at is not None:
+        ttl = min(ttl, expires_at - time.time())
+        if ttl <= 0:
+            return
+    _tokens.set(token, user_id, ttl=ttl)
+
+
+def get_profile(user_id: int) -> UserProfile | None:
+    return _profiles.get(user_id)
+
+
+def store_profile(user: User) -> UserProfile:
+    profile = UserProfile.from_user(user)
+    _profiles.set(user.id, profile)
+    return profile
+
+
+def invalidate_user(user_id: int) -> None:
+    """
+    Drops the cached profile; call after any change to the user row.
+    """
+    _profiles.pop(user_id)
+
+
+def cache_stats() -> dict:
+    return {
+        "tokens": _tokens.stats(),
+        "profiles": _profiles.stats()
+    }
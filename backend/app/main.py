@@ -1,12 +1,18 @@
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
-from app.database import engine, get_session
+from app.database import engine, dispose
 from app.models import User
 from app.services.auth import router as auth_router # Assuming auth.py is in the same folder or adjusted path
 from app.services.internal import router as internal_router 
 from app.services.chat import router as chat_router 
 from app.services.invertory import router as inventory_router
 from app.services.dashboard import router as  dashboard_router
+from app.services.jobs import router as jobs_router
+from app.integrations.app import warm_up
+from app.integrations import http_client
+from app.integrations import jobs
+from app.integrations import passwords
+from app.integrations import alternatives
 
 
 # Create tables on startup (For development only)
@@ -14,7 +20,16 @@ from app.services.dashboard import router as  dashboard_router
 async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
         await conn.run_sync(User.metadata.create_all)
+       
+    warm_up()
+    await http_client.startup()
+    await jobs.startup()
+    alternatives.start_loading()
     yield
+    await jobs.shutdown()
+    await http_client.shutdown()
+    passwords.shutdown()
+    await dispose()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -22,4 +37,5 @@ app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(internal_router, prefix="/v1", tags=["v1"])
 app.include_router(chat_router, prefix="/chat", tags=["Chat"])
 app.include_router(inventory_router, prefix="/inv", tags=["Inventory"])
-app.include_router(dashboard_router, prefix="/dashboard", tags=["Dashboard"])
\ No newline at end of file
+app.include_router(dashboard_router, prefix="/dashboard", tags=["Dashboard"])
+app.include_router(jobs_router, prefix="/jobs", tags=["Jobs"])
\ No newline at end of file
@@ -1,6 +1,8 @@
 from sqlmodel import SQLModel, Field
-from typing import Optional
-from datetime import datetime
+from sqlalchemy import Column, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from typing import Any, Optional
+from datetime import date, datetime
 
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -19,6 +21,8 @@ class User(SQLModel, table=True):
 
 
 class ChatHistory(SQLModel, table=True):
+    __table_args__ = (Index("ix_chathistory_user_id_timestamp", "user_id", "timestamp"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
     message: str
@@ -26,15 +30,84 @@ class ChatHistory(SQLModel, table=True):
     timestamp: datetime = Field(default_factory=datetime.now)
 
 
+class ChatSummary(SQLModel, table=True):
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    summary: str
+    last_chat_id: int  # newest ChatHistory.id folded into the summary
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+
 class Inventory(SQLModel, table=True):
-    user_id: int = Field(foreign_key="user.id")
+    __table_args__ = (
+        Index("ix_inventory_product_data", "product_data", postgresql_using="gin"),
+        Index("ix_inventory_user_id_timestamp", "user_id", "timestamp"),
+    )
+
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
     barcode: str = Field(primary_key=True)
     title: str
     img: str
     tag: str
     nutrient_score: str
-    product_data: str     
+    product_data: Any = Field(sa_column=Column(JSONB, nullable=False))
     ai_feedback: str     
     timestamp: datetime = Field(default_factory=datetime.now)
 
+    # Per-100 g values extracted from product_data on insert (see integrations/nutrients.py).
+    sugars_100g: Optional[float] = None
+    salt_100g: Optional[float] = None
+    fat_100g: Optional[float] = None
+    saturated_fat_100g: Optional[float] = None
+    proteins_100g: Optional[float] = None
+    energy_kcal_100g: Optional[float] = None
+    nova_group: Optional[int] = None
+    nutrition_grade: Optional[str] = None
+
+
+class ProductCache(SQLModel, table=True):
+    barcode: str = Field(primary_key=True)
+    product_data: str
+    fetched_at: datetime = Field(default_factory=datetime.now)
+
+
+class AIFeedbackCache(SQLModel, table=True):
+    barcode: str = Field(primary_key=True)
+    profile_fingerprint: str = Field(primary_key=True)
+    prompt_version: str = Field(primary_key=True)
+    feedback: str
+    product_hash: str = ""  # feedback_cache.product_hash() of the product it was written for
+    created_at: datetime = Field(default_factory=datetime.now)
+
+
+class DashboardSnapshot(SQLModel, table=True):
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    timeline: str = Field(primary_key=True)
+    inventory_hash: str
+    profile_hash: str
+    analysis: str
+    created_at: datetime = Field(default_factory=datetime.now)
+
+
+class JobRecord(SQLModel, table=True):
+    id: str = Field(primary_key=True)
+    kind: str
+    user_id: Optional[int] = Field(default=None, index=True)
+    status: str
+    result: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.now)
+    finished_at: Optional[datetime] = None
+
 
+class NutrientIntake(SQLModel, table=True):
+    """
+    Running per-user totals of per-100 g nutrient values over the products
+    added in each day/week/month, maintained on every inventory insert.
+    """
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    period: str = Field(primary_key=True)  # day | week | month
+    period_start: date = Field(primary_key=True)
+    nutrient: str = Field(primary_key=True)
+    total: float = 0.0
+    count: int = 0
+    exceeded: int = 0  # products over the user's disease.json limit for this nutrient
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
+from datetime import date
 
 class ImpactAnalysis(BaseModel):
     state: str
@@ -16,4 +17,19 @@ class DashboardAnalysisResponse(BaseModel):
     mood_analysis: ImpactAnalysis
     body_analysis: ImpactAnalysis
     key_nutrients: List[KeyNutrient]
-    recommendation: str
\ No newline at end of file
+    recommendation: str
+
+class NutrientAggregate(BaseModel):
+    total: float
+    average: Optional[float] = None
+    count: int
+    exceeded: int
+
+class IntakeBucket(BaseModel):
+    period_start: date
+    items: int
+    nutrients: Dict[str, NutrientAggregate]
+
+class IntakeResponse(BaseModel):
+    period: str
+    buckets: List[IntakeBucket]
@@ -1,5 +1,5 @@
-from typing import Optional
-from pydantic import BaseModel, EmailStr
+from typing import List, Optional
+from pydantic import BaseModel, EmailStr, Field
 
 class DetailsRequest(BaseModel):
     token: str
@@ -13,4 +13,15 @@ class ChatRequest(BaseModel):
 class CompareRequest(BaseModel):
     token: str
     product1: dict  # Full product data for first product
-    product2: dict  # Full product data for second product
\ No newline at end of file
+    product2: dict  # Full product data for second product
+    async_job: bool = False  # Return 202 with a job handle instead of waiting
+
+class AlternativesRequest(BaseModel):
+    token: str
+    barcode: str
+    limit: int = Field(default=5, ge=1, le=20)
+
+class RankRequest(BaseModel):
+    token: str
+    products: List[dict] = Field(min_length=2, max_length=50)  # Full product data, as for compare
+    top_k: int = Field(default=3, ge=1, le=10)  # How many of the best products the AI explains
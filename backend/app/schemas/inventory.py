@@ -1,4 +1,8 @@
-from pydantic import BaseModel
+import json
+from datetime import datetime
+from typing import Any, List, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 
 class InventoryAddRequest(BaseModel):
@@ -8,4 +12,67 @@ class InventoryAddRequest(BaseModel):
     tag: str
     nutrient_score: str
     product_data: str
-    ai_feedback: str 
+    ai_feedback: str
+
+
+class InventoryBulkAddRequest(BaseModel):
+    items: List[InventoryAddRequest] = Field(max_length=500)
+
+
+class InventoryBulkAddResult(BaseModel):
+    barcode: str
+    status: Literal["created", "duplicate"]
+
+
+class InventoryBulkAddResponse(BaseModel):
+    created: int
+    duplicates: int
+    items: List[InventoryBulkAddResult]
+
+
+class InventoryListItem(BaseModel):
+    """
+    List projection: the columns needed to render the inventory screen,
+    without the product_data / ai_feedback blobs.
+    """
+    model_config = ConfigDict(from_attributes=True)
+
+    barcode: str
+    title: str
+    img: str
+    tag: str
+    nutrient_score: str
+    timestamp: datetime
+    nutrition_grade: Optional[str] = None
+    nova_group: Optional[int] = None
+
+
+class InventoryItemResponse(BaseModel):
+    """
+    An inventory row as the app expects it: product_data is stored as JSONB
+    but still returned as a JSON string.
+    """
+    model_config = ConfigDict(from_attributes=True)
+
+    user_id: int
+    barcode: str
+    title: str
+    img: str
+    tag: str
+    nutrient_score: str
+    product_data: str
+    ai_feedback: str
+    timestamp: datetime
+    sugars_100g: Optional[float] = None
+    salt_100g: Optional[float] = None
+    fat_100g: Optional[float] = None
+    saturated_fat_100g: Optional[float] = None
+    proteins_100g: Optional[float] = None
+    energy_kcal_100g: Optional[float] = None
+    nova_group: Optional[int] = None
+    nutrition_grade: Optional[str] = None
+
+    @field_validator("product_data", mode="before")
+    @classmethod
+    def _dump_product_data(cls, value: Any) -> str:
+        return value if isinstance(value, str) else json.dumps(value)
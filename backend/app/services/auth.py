@@ -1,8 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-import bcrypt
 import os
 
    
@@ -10,8 +9,13 @@ from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.models import User
-from app.database import get_session
+from app.database import get_session, get_read_session
 from app.schemas.auth import RegisterRequest, LoginRequest, UserResponse, Token, SurveyRequest
+from app.integrations import dashboard_cache
+from app.integrations import user_cache
+from app.integrations import intake
+from app.integrations.user_cache import UserProfile
+from app.integrations.passwords import HashingBusy, get_password_hasher
 
 router = APIRouter()
 
@@ -32,11 +36,23 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_password(plain_password, hashed_password):
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+HASHING_BUSY = HTTPException(
+    status_code=503,
+    detail="Too many sign-in attempts in progress. Please try again shortly.",
+    headers={"Retry-After": "1"},
+)
 
-def get_password_hash(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+async def verify_password(plain_password, hashed_password):
+    try:
+        return await get_password_hasher().verify(plain_password, hashed_password)
+    except HashingBusy:
+        raise HASHING_BUSY
+
+async def get_password_hash(password):
+    try:
+        return await get_password_hasher().hash(password)
+    except HashingBusy:
+        raise HASHING_BUSY
 
 
    
@@ -51,7 +67,7 @@ async def register_user(request: RegisterRequest, db: AsyncSession = Depends(get
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_pwd = get_password_hash(request.password)
+    hashed_pwd = await get_password_hash(request.password)
     
     new_user = User(
         name=request.name,
@@ -72,8 +88,16 @@ async def login(request: LoginRequest, db: AsyncSession = Depends(get_session)):
     result = await db.exec(statement)
     user = result.first()
 
-    if not user or not verify_password(request.password, user.password_hash):
+    if not user or not await verify_password(request.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    # BCRYPT_ROUNDS changed since this hash was made: upgrade it while we have the plaintext.
+    new_hash = await get_password_hasher().rehash_if_needed(request.password, user.password_hash)
+    if new_hash is not None:
+        user.password_hash = new_hash
+        db.add(user)
+        await db.commit()
+        user_cache.invalidate_user(user.id)
     
     access_token = create_access_token(data={"sub": str(user.id)})
     return {
@@ -85,33 +109,65 @@ async def login(request: LoginRequest, db: AsyncSession = Depends(get_session)):
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")    
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_session)):
-    credentials_exception = HTTPException(
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _user_id_from_token(token: str) -> int:
+    user_id = user_cache.get_token(token)
+    if user_id is not None:
+        return user_id
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
+        user_id = payload.get("sub")
         if user_id is None:
-            raise credentials_exception
+            raise _credentials_exception()
     except JWTError:
-        raise credentials_exception
-    
+        raise _credentials_exception()
+    user_id = int(user_id)
+    user_cache.store_token(token, user_id, payload.get("exp"))
+    return user_id
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_session)):
+    """
+    The authenticated User row, attached to this request's session. Use this
+    when the handler modifies the user; read-only handlers should depend on
+    get_current_profile, which usually skips the database.
+    """
+    user_id = _user_id_from_token(token)
        
-    statement = select(User).where(User.id == int(user_id))
+    statement = select(User).where(User.id == user_id)
     result = await db.exec(statement)
     user = result.first()
     
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    user_cache.store_profile(user)
     return user
 
+async def get_current_profile(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_session)) -> UserProfile:
+    """
+    Immutable snapshot of the authenticated user, served from the user cache
+    and only loaded from the database on a miss.
+    """
+    user_id = _user_id_from_token(token)
+    profile = user_cache.get_profile(user_id)
+    if profile is not None:
+        return profile
+
+    user = await db.get(User, user_id)
+    if user is None:
+        raise _credentials_exception()
+    return user_cache.store_profile(user)
+
 
 @router.post("/submit-survey/", response_model=UserResponse)
 async def submit_survey(
     survey_data: SurveyRequest,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),    
     db: AsyncSession = Depends(get_session)
 ):
@@ -139,10 +195,16 @@ async def submit_survey(
     db.add(current_user)
     await db.commit()
     await db.refresh(current_user)
+    # Cache the committed row straight away so read-replica lag can't serve the old profile.
+    user_cache.store_profile(current_user)
+
+    dashboard_cache.schedule_refresh(background_tasks, current_user.id)
+    # Exceedance counts depend on the conditions and gender just submitted.
+    background_tasks.add_task(intake.safe_rebuild_user, current_user.id)
     
     return current_user
 
 
 @router.get("/me/", response_model=UserResponse)
-async def read_users_me(current_user: User = Depends(get_current_user)):
-    return current_user
\ No newline at end of file
+async def read_users_me(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_read_session)):
+    return await get_current_profile(token, db)
\ No newline at end of file
@@ -1,18 +1,30 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlmodel import select
+from sqlalchemy import tuple_
 from sqlmodel.ext.asyncio.session import AsyncSession
-from typing import List
+from typing import List, Optional
+from datetime import datetime
+import base64
+import json
 
    
 from app.models import User, ChatHistory
-from app.database import get_session
-from app.services.auth import get_current_user
+from app.database import async_session, read_session, get_session, get_read_session
+from app.services.auth import get_current_profile
+from app.integrations.user_cache import UserProfile
    
 from app.integrations.app import NutritionAnalyzer
+from app.integrations.llm import cancel_on_disconnect
+from app.integrations import chat_summary
 
 router = APIRouter()
 
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+HISTORY_EXPORT_BATCH = 500
+
    
 class ChatRequest(BaseModel):
     message: str
@@ -23,51 +35,50 @@ class ChatResponse(BaseModel):
 
    
 
+def _chat_profile(user: UserProfile) -> dict:
+    return {
+        "name": user.name,
+        "disease": user.health_issues,
+        "goals": user.goals,
+        "allergies": user.dietary_preferences
+    }
+
+
+def _sse(data: dict, event: str | None = None) -> str:
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+
 @router.post("/", response_model=ChatResponse)
 async def chat_with_nutrio(
     request: ChatRequest,
-    current_user: User = Depends(get_current_user),
+    http_request: Request,
+    background_tasks: BackgroundTasks,
+    current_user: UserProfile = Depends(get_current_profile),
     db: AsyncSession = Depends(get_session)
 ):
     """
     Endpoint to chat with the AI.
     1. Authenticates user.
-    2. Fetches recent chat history.
+    2. Fetches the rolling summary plus the latest raw turns.
     3. Generates AI response.
-    4. Saves interaction to DB.
+    4. Saves interaction to DB and folds older turns into the summary in the background.
     """
        
        
-    statement = (
-        select(ChatHistory)
-        .where(ChatHistory.user_id == current_user.id)
-        .order_by(ChatHistory.timestamp.desc())
-        .limit(10)
-    )
-    result = await db.exec(statement)
-    history_records = result.all()
-    
-       
-    history_context = ""
-    for record in reversed(history_records):
-        history_context += f"User: {record.message}\nAI: {record.response}\n"
-
-    if not history_context:
-        history_context = "No previous conversation."
+    history_context = await chat_summary.build_history_context(db, current_user.id)
 
        
-    user_profile = {
-        "name": current_user.name,
-        "disease": current_user.health_issues,
-        "goals": current_user.goals,
-        "allergies": current_user.dietary_preferences
-    }
+    user_profile = _chat_profile(current_user)
 
        
-    ai_result = NutritionAnalyzer.process_chat_message(
-        user_message=request.message,
-        user_profile=user_profile,
-        history_context=history_context
+    ai_result = await cancel_on_disconnect(
+        http_request,
+        NutritionAnalyzer.process_chat_message(
+            user_message=request.message,
+            user_profile=user_profile,
+            history_context=history_context
+        )
     )
 
     ai_text = ai_result['response']
@@ -82,36 +93,168 @@ async def chat_with_nutrio(
     db.add(new_chat_entry)
     await db.commit()
     await db.refresh(new_chat_entry)
+    background_tasks.add_task(chat_summary.update_summary, current_user.id)
 
     return {
         "response": ai_text,
         "timestamp": new_chat_entry.timestamp.isoformat()
     }
 
+@router.post("/stream")
+async def stream_chat_with_nutrio(
+    request: ChatRequest,
+    http_request: Request,
+    background_tasks: BackgroundTasks,
+    current_user: UserProfile = Depends(get_current_profile),
+    db: AsyncSession = Depends(get_session)
+):
+    """
+    Streaming variant of the chat endpoint (Server-Sent Events).
+    Emits `data: {"token": ...}` events while Gemini generates, then a final
+    `event: done` carrying the full response and timestamp. The ChatHistory
+    row is only written once the stream has finished, so a client that
+    disconnects half way never leaves a partial answer behind.
+    """
+    history_context = await chat_summary.build_history_context(db, current_user.id)
+    user_profile = _chat_profile(current_user)
+    user_id = current_user.id
+    # Runs after the stream ends; a no-op if nothing new was saved.
+    background_tasks.add_task(chat_summary.update_summary, user_id)
+
+    async def event_stream():
+        parts = []
+        try:
+            async for chunk in NutritionAnalyzer.stream_chat_message(
+                user_message=request.message,
+                user_profile=user_profile,
+                history_context=history_context
+            ):
+                if await http_request.is_disconnected():
+                    return
+                parts.append(chunk)
+                yield _sse({"token": chunk})
+        except Exception as e:
+            print(f"Chat Stream Error: {str(e)}")
+            yield _sse({"message": "I'm having trouble connecting right now. Please try again."}, event="error")
+            return
+
+        if await http_request.is_disconnected():
+            return
+
+           
+           
+        ai_text = "".join(parts)
+        async with async_session() as session:
+            new_chat_entry = ChatHistory(
+                user_id=user_id,
+                message=request.message,
+                response=ai_text
+            )
+            session.add(new_chat_entry)
+            await session.commit()
+            await session.refresh(new_chat_entry)
+
+        yield _sse({"response": ai_text, "timestamp": new_chat_entry.timestamp.isoformat()}, event="done")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _encode_cursor(record: ChatHistory) -> str:
+    raw = f"{record.timestamp.isoformat()}|{record.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        timestamp, record_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        return datetime.fromisoformat(timestamp), int(record_id)
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _history_item(record: ChatHistory) -> dict:
+    return {
+        "message": record.message,
+        "response": record.response,
+        "timestamp": record.timestamp
+    }
+
+
 @router.get("/history", response_model=List[dict])
 async def get_chat_history(
     token: str,
-    db: AsyncSession = Depends(get_session)
+    response: Response,
+    limit: int = Query(default=HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    before: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_session)
 ):
     """
-    Optional: Endpoint to load previous messages when the user opens the chat screen.
+    Load previous messages when the user opens the chat screen.
+    Returns the newest `limit` messages (oldest first); to page further back,
+    pass the X-Next-Cursor response header as `before`. The header is absent
+    on the last page.
     """
-    current_user = await get_current_user(token, db)
+    current_user = await get_current_profile(token, db)
     if not current_user:
         raise HTTPException(status_code=401, detail="Invalid auth token")
 
     statement = (
         select(ChatHistory)
         .where(ChatHistory.user_id == current_user.id)
-        .order_by(ChatHistory.timestamp.asc()) 
+        .order_by(ChatHistory.timestamp.desc(), ChatHistory.id.desc())
+        .limit(limit + 1)
     )
+    if before:
+        timestamp, record_id = _decode_cursor(before)
+        statement = statement.where(tuple_(ChatHistory.timestamp, ChatHistory.id) < (timestamp, record_id))
+
     result = await db.exec(statement)
     history = result.all()
 
-    return [
-        {
-            "message": h.message,
-            "response": h.response,
-            "timestamp": h.timestamp
-        } for h in history
-    ]
\ No newline at end of file
+    if len(history) > limit:
+        history = history[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(history[-1])
+
+    return [_history_item(h) for h in reversed(history)]
+
+
+@router.get("/history/export")
+async def export_chat_history(
+    token: str,
+    db: AsyncSession = Depends(get_read_session)
+):
+    """
+    Full chat history as NDJSON (one JSON object per line, oldest first),
+    read in keyset batches so large histories never sit in memory at once.
+    """
+    current_user = await get_current_profile(token, db)
+    user_id = current_user.id
+
+    async def export():
+        after = None
+        async with read_session() as session:
+            while True:
+                statement = (
+                    select(ChatHistory)
+                    .where(ChatHistory.user_id == user_id)
+                    .order_by(ChatHistory.timestamp.asc(), ChatHistory.id.asc())
+                    .limit(HISTORY_EXPORT_BATCH)
+                )
+                if after is not None:
+                    statement = statement.where(tuple_(ChatHistory.timestamp, ChatHistory.id) > after)
+                result = await session.exec(statement)
+                batch = result.all()
+                if not batch:
+                    return
+                yield "".join(json.dumps(_history_item(h), default=str) + "\n" for h in batch)
+                after = (batch[-1].timestamp, batch[-1].id)
+                session.expunge_all()
+
+    return StreamingResponse(
+        export(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="chat-history.ndjson"'}
+    )
@@ -1,43 +1,74 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import select
+from fastapi import APIRouter, Depends, Query, Request
 from sqlmodel.ext.asyncio.session import AsyncSession
-from typing import List
+from typing import Literal
 
-   
-from app.models import User, Inventory
-from app.database import get_session
-from app.services.auth import get_current_user
-from app.schemas.dashboard import DashboardAnalysisResponse
-from app.integrations.app import generate_dashboard_stats
+from app.database import async_session, get_session, get_read_session
+from app.services.auth import get_current_profile
+from app.integrations.user_cache import UserProfile
+from app.schemas.dashboard import DashboardAnalysisResponse, IntakeResponse
+from app.integrations.llm import cancel_on_disconnect
+from app.integrations import dashboard_cache
+from app.integrations import intake
+from app.services.jobs import submit_job
 
 router = APIRouter()
 
 @router.get("/stats", response_model=DashboardAnalysisResponse)
 async def get_dashboard_stats(
     timeline: str,
-    current_user: User = Depends(get_current_user),
+    http_request: Request,
+    async_job: bool = False,
+    current_user: UserProfile = Depends(get_current_profile),
     db: AsyncSession = Depends(get_session)
 ):
     """
     Generates AI-powered dashboard statistics based on the user's current inventory
-    and health profile.
+    and health profile. Results are stored per (timeline, inventory hash, profile hash),
+    so repeat views are served without calling the model.
+    With async_job=true a cache miss answers 202 with a job handle instead of
+    holding the connection open while the model runs.
     """
        
-    statement = select(Inventory).where(Inventory.user_id == current_user.id)
-    result = await db.exec(statement)
-    inventory_items = result.all()
+    user_profile = dashboard_cache.dashboard_profile(current_user)
+    prof_hash = dashboard_cache.profile_hash(user_profile)
+    inv_hash = await dashboard_cache.inventory_hash(db, current_user.id)
 
-       
-    user_profile = {
-        "name": current_user.name,
-        "gender": current_user.gender,
-        "disease": current_user.health_issues,
-        "goals": current_user.goals,
-        "allergies": current_user.dietary_preferences
-    }
+    cached = await dashboard_cache.get_snapshot(db, current_user.id, timeline, inv_hash, prof_hash)
+    if cached is not None:
+        return cached
+
+    if async_job:
+        user_id = current_user.id
+
+        async def run():
+            async with async_session() as session:
+                return await dashboard_cache.compute_dashboard(session, user_id, user_profile, timeline, inv_hash, prof_hash)
+
+        return await submit_job("dashboard", user_id, run, dedupe_key=("dashboard", user_id, timeline, inv_hash, prof_hash))
 
        
        
-    analysis_result = generate_dashboard_stats(user_profile, inventory_items,timeline)
+    analysis_result = await cancel_on_disconnect(
+        http_request,
+        dashboard_cache.compute_dashboard(db, current_user.id, user_profile, timeline, inv_hash, prof_hash)
+    )
+
+    return analysis_result
 
-    return analysis_result
\ No newline at end of file
+
+@router.get("/intake", response_model=IntakeResponse)
+async def get_nutrient_intake(
+    period: Literal["day", "week", "month"] = "week",
+    periods: int = Query(default=12, ge=1, le=366),
+    current_user: UserProfile = Depends(get_current_profile),
+    db: AsyncSession = Depends(get_read_session)
+):
+    """
+    Per-nutrient totals, averages and over-limit counts for the user's most
+    recent `periods` days/weeks/months, newest first. Read straight from the
+    aggregates kept up to date on every inventory insert.
+    """
+    return {
+        "period": period,
+        "buckets": await intake.get_intake(db, current_user.id, period, periods)
+    }
@@ -1,96 +1,160 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Request
 from typing import Optional
+import os
+import hmac
+import json
 import httpx
 
    
-from app.schemas.internal import DetailsRequest, CompareRequest
-from app.services.auth import get_current_user
+from app.schemas.internal import AlternativesRequest, DetailsRequest, CompareRequest, RankRequest
+from app.services.auth import get_current_profile
 from app.models import User
-from app.database import get_session
+from app.database import get_session, pool_stats
 from sqlmodel.ext.asyncio.session import AsyncSession
-from app.integrations.app import analyze_nutrition, compare_products
+from app.integrations.app import analyze_nutrition, compare_products, rank_products, ANALYZE_PROMPT_VERSION
+from app.integrations.llm import cancel_on_disconnect
+from app.integrations.embedding_cache import get_embedding_cache
+from app.integrations.openfoodfacts import get_product, find_product, ProductNotFound, cache_stats
+from app.integrations.http_client import get_http_client
+from app.integrations import singleflight
+from app.integrations import feedback_cache
+from app.integrations import user_cache
+from app.integrations import chat_summary
+from app.integrations import prompt_builder
+from app.integrations.alternatives import get_product_index
+from app.integrations import jobs
+from app.integrations.passwords import get_password_hasher
+from app.services.jobs import submit_job
 
 router = APIRouter()
 
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
 @router.post("/details")
-async def get_product_details(request: DetailsRequest,db: AsyncSession = Depends(get_session)):
-    current_user = await get_current_user(request.token,db)
+async def get_product_details(request: DetailsRequest, http_request: Request, db: AsyncSession = Depends(get_session)):
+    current_user = await get_current_profile(request.token, db)
     if not current_user:
         raise HTTPException(status_code=401, detail="Invalid auth token")
 
-    async with httpx.AsyncClient() as client:
-        if request.barcode:
-            url = f"https://world.openfoodfacts.net/api/v2/product/{request.barcode}"
-            params = {
-                "fields": "product_name,nutrition_grades,nutriments,image_url,code,"
-        "nutrient_levels,serving_size,ingredients_text,nova_group,"
-        "ingredients_analysis_tags,categories_tags,categories"
-            }
-            try:
-                response = await client.get(url, params=params)
-                data = response.json()
-                if data.get("status") != 1:
-                    raise HTTPException(status_code=404, detail="Product not found by barcode")
-                return {
-                    "product": data.get("product"),
-                    "aifeedback": analyze_nutrition(
-                    nutrition=data.get("product"),
-                    disease = current_user.health_issues or "",
-                    goals = current_user.goals or "",
-                    allergies = current_user.dietary_preferences or ""
-                    )}
-            except httpx.RequestError:
-                raise HTTPException(status_code=503, detail="External API unavailable")
-
-        elif request.product_name:
-            url = "https://world.openfoodfacts.org/cgi/search.pl"
-            
-            params = {
-                "search_terms": request.product_name,
-                "search_simple": 1,
-                "action": "process",
-                "json": 1,
-                "page_size": 1,
-                "fields": "product_name,nutrition_grades,nutriments,image_url,code"
-            }
-            
-            try:
-                response = await client.get(url, params=params)
-                data = response.json()
-                
-                products = data.get("products", [])
-                if not products:
-                    raise HTTPException(status_code=404, detail="Product not found by name")
-                return {
-                    "source": "search",
-                    "product": products[0]
-                }
-            except httpx.RequestError:
-                raise HTTPException(status_code=503, detail="External API unavailable")
-        else:
-            raise HTTPException(
-                status_code=400, 
-                detail="Please provide either a 'barcode' or a 'product_name'"
-            )
+    if request.barcode:
+        try:
+            product = await get_product(request.barcode, db)
+        except ProductNotFound:
+            raise HTTPException(status_code=404, detail="Product not found by barcode")
+        except httpx.HTTPError:
+            raise HTTPException(status_code=503, detail="External API unavailable")
+
+        get_product_index().add(request.barcode, product)
+
+        fingerprint = feedback_cache.profile_fingerprint(
+            current_user.health_issues,
+            current_user.goals,
+            current_user.dietary_preferences,
+            current_user.gender
+        )
+        product_digest = feedback_cache.product_hash(product)
+        aifeedback = await feedback_cache.get_feedback(
+            db, request.barcode, fingerprint, ANALYZE_PROMPT_VERSION, product_digest
+        )
+        if aifeedback is None:
+            aifeedback = await cancel_on_disconnect(
+                http_request,
+                analyze_nutrition(
+                nutrition=product,
+                disease = current_user.health_issues or "",
+                gender = current_user.gender or "male",
+                goals = current_user.goals or "",
+                allergies = current_user.dietary_preferences or ""
+                ))
+               
+            if aifeedback and aifeedback != "Error":
+                await feedback_cache.store_feedback(
+                    db, request.barcode, fingerprint, ANALYZE_PROMPT_VERSION, product_digest, aifeedback
+                )
+        return {
+            "product": product,
+            "aifeedback": aifeedback
+        }
+
+    elif request.product_name:
+        try:
+            product = await find_product(request.product_name)
+        except ProductNotFound:
+            raise HTTPException(status_code=404, detail="Product not found by name")
+        except httpx.HTTPError:
+            raise HTTPException(status_code=503, detail="External API unavailable")
+        return {
+            "source": "search",
+            "product": product
+        }
+    else:
+        raise HTTPException(
+            status_code=400, 
+            detail="Please provide either a 'barcode' or a 'product_name'"
+        )
+
+
+@router.post("/alternatives")
+async def get_alternatives(request: AlternativesRequest, db: AsyncSession = Depends(get_session)):
+    """
+    Healthier products from the same category for the user's conditions,
+    answered from the local product index (no AI call).
+    """
+    current_user = await get_current_profile(request.token, db)
+
+    try:
+        product = await get_product(request.barcode, db)
+    except ProductNotFound:
+        raise HTTPException(status_code=404, detail="Product not found by barcode")
+    except httpx.HTTPError:
+        raise HTTPException(status_code=503, detail="External API unavailable")
+
+    index = get_product_index()
+    index.add(request.barcode, product)
+    return {
+        "barcode": request.barcode,
+        "alternatives": index.alternatives(
+            request.barcode,
+            product,
+            current_user.health_issues,
+            current_user.gender,
+            limit=request.limit
+        )
+    }
 
 
 @router.post("/compare")
-async def compare_two_products(request: CompareRequest, db: AsyncSession = Depends(get_session)):
+async def compare_two_products(request: CompareRequest, http_request: Request, db: AsyncSession = Depends(get_session)):
     """
     Compare two products and determine which is better for the user based on their health profile.
     """
-    current_user = await get_current_user(request.token, db)
+    current_user = await get_current_profile(request.token, db)
     if not current_user:
         raise HTTPException(status_code=401, detail="Invalid auth token")
 
+    compare_args = dict(
+        product1=request.product1,
+        product2=request.product2,
+        disease=current_user.health_issues or "",
+        gender=current_user.gender or "male",
+        goals=current_user.goals or "",
+        allergies=current_user.dietary_preferences or ""
+    )
+
+    if request.async_job:
+        async def run():
+            result = await compare_products(**compare_args)
+            if not result['success']:
+                raise RuntimeError(result.get('message', 'Failed to compare products'))
+            return {"success": True, "comparison": result['comparison']}
+
+        dedupe_key = ("compare", current_user.id, json.dumps([request.product1, request.product2], sort_keys=True, default=str))
+        return await submit_job("compare", current_user.id, run, dedupe_key=dedupe_key)
+
     try:
-        result = compare_products(
-            product1=request.product1,
-            product2=request.product2,
-            disease=current_user.health_issues or "",
-            gender=current_user.gender or "male",
-            goals=current_user.goals or "",
-            allergies=current_user.dietary_preferences or ""
+        result = await cancel_on_disconnect(
+            http_request,
+            compare_products(**compare_args)
         )
 
         if result['success']:
@@ -103,9 +167,75 @@ async def compare_two_products(request: CompareRequest, db: AsyncSession = Depen
                 status_code=500,
                 detail=result.get('message', 'Failed to compare products')
             )
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Compare endpoint error: {e}")
         raise HTTPException(
             status_code=500,
             detail=f"Error comparing products: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.post("/rank")
+async def rank_many_products(request: RankRequest, http_request: Request, db: AsyncSession = Depends(get_session)):
+    """
+    Rank 2-50 products for the user's health profile. Scoring is local; a
+    single AI call explains only the top `top_k`.
+    """
+    current_user = await get_current_profile(request.token, db)
+
+    try:
+        return await cancel_on_disconnect(
+            http_request,
+            rank_products(
+                products=request.products,
+                disease=current_user.health_issues or "",
+                gender=current_user.gender or "male",
+                goals=current_user.goals or "none",
+                allergies=current_user.dietary_preferences or "none",
+                top_k=request.top_k
+            )
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Rank endpoint error: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error ranking products: {str(e)}"
+        )
+
+
+def require_metrics_access(request: Request, x_metrics_token: Optional[str] = Header(default=None)):
+    """
+    /metrics is for operators only: callers must send X-Metrics-Token
+    matching METRICS_TOKEN. Without a configured token only requests from
+    the local machine are allowed.
+    """
+    if METRICS_TOKEN:
+        if x_metrics_token is None or not hmac.compare_digest(x_metrics_token, METRICS_TOKEN):
+            raise HTTPException(status_code=403, detail="Forbidden")
+    elif request.client is None or request.client.host not in ("127.0.0.1", "::1", "localhost"):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+@router.get("/metrics", dependencies=[Depends(require_metrics_access)])
+async def get_metrics():
+    """
+    Cache and pool counters for capacity planning.
+    """
+    return {
+        "embedding_cache": get_embedding_cache().stats(),
+        "product_cache": cache_stats(),
+        "http_pool": get_http_client().stats(),
+        "coalesced": singleflight.stats(),
+        "feedback_cache": feedback_cache.cache_stats(),
+        "jobs": jobs.stats(),
+        "password_hashing": get_password_hasher().stats(),
+        "user_cache": user_cache.cache_stats(),
+        "db_pool": pool_stats(),
+        "chat_history": chat_summary.size_stats(),
+        "prompt_tokens": prompt_builder.usage_stats(),
+        "alternatives_index": get_product_index().stats()
+    }
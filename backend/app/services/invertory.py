@@ -1,80 +1,272 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response, status
 from sqlmodel import select
+from sqlalchemy import tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlmodel.ext.asyncio.session import AsyncSession
-from typing import List
-from app.schemas.inventory import InventoryAddRequest
+from typing import List, Literal, Optional, Union
+from datetime import datetime
+import base64
+import json
+from app.schemas.inventory import (
+    InventoryAddRequest,
+    InventoryBulkAddRequest,
+    InventoryBulkAddResponse,
+    InventoryItemResponse,
+    InventoryListItem,
+)
 
    
 from app.models import User, Inventory
-from app.database import get_session
-from app.services.auth import get_current_user 
+from app.database import get_session, get_read_session
+from app.services.auth import get_current_profile
+from app.integrations.user_cache import UserProfile
+from app.integrations import dashboard_cache
+from app.integrations import intake
+from app.integrations.nutrients import extract_nutrients, parse_product_data
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Inventory])
+INVENTORY_MAX_PAGE_SIZE = 500
+
+# sort name -> (column, descending)
+INVENTORY_SORTS = {
+    "newest": (Inventory.timestamp, True),
+    "oldest": (Inventory.timestamp, False),
+    "title": (Inventory.title, False),
+}
+LIST_COLUMNS = [getattr(Inventory, name) for name in InventoryListItem.model_fields]
+
+
+def _encode_cursor(sort: str, value, barcode: str) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort, value, barcode])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str, sort: str) -> tuple:
+    try:
+        cursor_sort, value, barcode = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if cursor_sort != sort:
+            raise ValueError(cursor_sort)
+        if INVENTORY_SORTS[sort][0] is Inventory.timestamp:
+            value = datetime.fromisoformat(value)
+        return value, str(barcode)
+    except (ValueError, TypeError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _naive_local(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Inventory timestamps are naive server-local times (datetime.now()), so
+    timezone-aware bounds such as ...Z are converted before comparing.
+    """
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
+
+
+@router.get("/", response_model=Union[List[InventoryItemResponse], List[InventoryListItem]])
 async def get_user_inventory(
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_session)
+    response: Response,
+    limit: Optional[int] = Query(default=None, ge=1, le=INVENTORY_MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    sort: Literal["newest", "oldest", "title"] = "newest",
+    tag: Optional[str] = None,
+    nutrient_score: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    view: Literal["full", "list"] = "full",
+    current_user: UserProfile = Depends(get_current_profile),
+    db: AsyncSession = Depends(get_read_session)
 ):
     """
-    Retrieve all inventory items for the currently authenticated user.
+    Retrieve the authenticated user's inventory: everything by default, or
+    one page at a time when `limit` is given.
+    Filters: tag, nutrient_score, and since/until on the time added.
+    view=list returns only the list columns; fetch an item's product_data
+    and ai_feedback from /inv/{barcode}. When more items exist, the
+    X-Next-Cursor response header holds the value to pass as `after`.
     """
+    column, descending = INVENTORY_SORTS[sort]
+    position = _decode_cursor(after, sort) if after else None
+    since = _naive_local(since)
+    until = _naive_local(until)
+
     try:
-        statement = select(Inventory).where(Inventory.user_id == current_user.id)
+        statement = select(*LIST_COLUMNS) if view == "list" else select(Inventory)
+        statement = statement.where(Inventory.user_id == current_user.id)
+        if tag is not None:
+            statement = statement.where(Inventory.tag == tag)
+        if nutrient_score is not None:
+            statement = statement.where(Inventory.nutrient_score == nutrient_score)
+        if since is not None:
+            statement = statement.where(Inventory.timestamp >= since)
+        if until is not None:
+            statement = statement.where(Inventory.timestamp < until)
+        if position is not None:
+            key = tuple_(column, Inventory.barcode)
+            statement = statement.where(key < position if descending else key > position)
+        if descending:
+            statement = statement.order_by(column.desc(), Inventory.barcode.desc())
+        else:
+            statement = statement.order_by(column.asc(), Inventory.barcode.asc())
+
+        if limit is not None:
+            statement = statement.limit(limit + 1)
         result = await db.exec(statement)
-        return result.all()
+        items = result.all()
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, 
             detail=f"Error fetching inventory: {str(e)}"
         )
 
-@router.post("/add/", response_model=Inventory, status_code=201)
-async def add_to_inventory(
-    item_data: InventoryAddRequest,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_session)
+    if limit is not None and len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        response.headers["X-Next-Cursor"] = _encode_cursor(sort, getattr(last, column.key), last.barcode)
+
+    if view == "list":
+        return [InventoryListItem.model_validate(row._mapping) for row in items]
+    return items
+
+
+@router.get("/{barcode}", response_model=InventoryItemResponse)
+async def get_inventory_item(
+    barcode: str,
+    current_user: UserProfile = Depends(get_current_profile),
+    db: AsyncSession = Depends(get_read_session)
 ):
     """
-    Add a new product to the user's inventory.
+    One inventory item with its full product_data and ai_feedback.
     """
-       
-       
     statement = select(Inventory).where(
-        Inventory.user_id == current_user.id, 
-        Inventory.barcode == item_data.barcode
+        Inventory.user_id == current_user.id,
+        Inventory.barcode == barcode
     )
     result = await db.exec(statement)
-    existing_item = result.first()
+    item = result.first()
+    if item is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found in your inventory.")
+    return item
+
+def _inventory_values(user_id: int, item_data: InventoryAddRequest, timestamp: datetime) -> dict:
+    product_data = parse_product_data(item_data.product_data)
+    return {
+        **extract_nutrients(product_data),
+        "user_id": user_id,
+        "barcode": item_data.barcode,
+        "title": item_data.title,
+        "img": item_data.img,
+        "tag": item_data.tag,
+        "nutrient_score": item_data.nutrient_score,
+        "product_data": product_data,
+        "ai_feedback": item_data.ai_feedback,
+        "timestamp": timestamp
+    }
 
-    if existing_item:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="Product already exists in your inventory."
-        )
 
-       
-    new_item = Inventory(
-        user_id=current_user.id,
-        barcode=item_data.barcode,
-        title=item_data.title,
-        img=item_data.img,
-        tag=item_data.tag,
-        nutrient_score=item_data.nutrient_score,
-        product_data=item_data.product_data,
-        ai_feedback=item_data.ai_feedback
+@router.post("/add/", response_model=InventoryItemResponse, status_code=201)
+async def add_to_inventory(
+    item_data: InventoryAddRequest,
+    background_tasks: BackgroundTasks,
+    current_user: UserProfile = Depends(get_current_profile),
+    db: AsyncSession = Depends(get_session)
+):
+    """
+    Add a new product to the user's inventory. product_data is stored as
+    JSONB and its per-100 g nutrients are copied into typed columns.
+    """
+    values = _inventory_values(current_user.id, item_data, datetime.now())
+    statement = (
+        insert(Inventory)
+        .values(values)
+        .on_conflict_do_nothing(index_elements=[Inventory.user_id, Inventory.barcode])
+        .returning(Inventory)
     )
 
     try:
-        db.add(new_item)
+        result = await db.exec(statement)
+        new_item = result.scalars().first()
+        if new_item is not None:
+            await intake.record_items(db, current_user.id, [values], current_user.health_issues, current_user.gender)
         await db.commit()
-        await db.refresh(new_item)
-        return new_item
     except Exception as e:
         await db.rollback()
-           
-           
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Could not add item. It might already exist in the system. Error: {str(e)}"
-        )
\ No newline at end of file
+            detail=f"Could not add item. Error: {str(e)}"
+        )
+
+    if new_item is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Product already exists in your inventory."
+        )
+
+    dashboard_cache.schedule_refresh(background_tasks, current_user.id)
+    return new_item
+
+
+@router.post("/bulk/", response_model=InventoryBulkAddResponse)
+async def bulk_add_to_inventory(
+    request: InventoryBulkAddRequest,
+    background_tasks: BackgroundTasks,
+    current_user: UserProfile = Depends(get_current_profile),
+    db: AsyncSession = Depends(get_session)
+):
+    """
+    Add many products in one round-trip (e.g. scans queued while offline).
+    All items are written with a single INSERT ... ON CONFLICT DO NOTHING;
+    each barcode is reported as "created" or "duplicate" (already in the
+    inventory, or repeated earlier in the same request).
+    """
+    timestamp = datetime.now()
+    rows = {}
+    for item_data in request.items:
+        rows.setdefault(item_data.barcode, _inventory_values(current_user.id, item_data, timestamp))
+
+    created = set()
+    if rows:
+        statement = (
+            insert(Inventory)
+            .values(list(rows.values()))
+            .on_conflict_do_nothing(index_elements=[Inventory.user_id, Inventory.barcode])
+            .returning(Inventory.barcode)
+        )
+        try:
+            result = await db.exec(statement)
+            created = set(result.scalars().all())
+            await intake.record_items(
+                db,
+                current_user.id,
+                [rows[barcode] for barcode in created],
+                current_user.health_issues,
+                current_user.gender
+            )
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Could not add items. Error: {str(e)}"
+            )
+
+    results = []
+    for item_data in request.items:
+        if item_data.barcode in created:
+            created.discard(item_data.barcode)
+            results.append({"barcode": item_data.barcode, "status": "created"})
+        else:
+            results.append({"barcode": item_data.barcode, "status": "duplicate"})
+
+    created_count = sum(1 for r in results if r["status"] == "created")
+    if created_count:
+        dashboard_cache.schedule_refresh(background_tasks, current_user.id)
+
+    return {
+        "created": created_count,
+        "duplicates": len(results) - created_count,
+        "items": results
+    }
@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
+
+from app.services.auth import get_current_profile
+from app.integrations.user_cache import UserProfile
+from app.integrations.jobs import JobQueueFull, get_job_manager
+
+router = APIRouter()
+
+
+async def submit_job(kind: str, user_id: int, fn, dedupe_key=None) -> JSONResponse:
+    """
+    Queues `fn` and answers 202 with a handle the client can poll.
+    """
+    try:
+        job = await get_job_manager().submit(kind, user_id, fn, dedupe_key=dedupe_key)
+    except JobQueueFull:
+        raise HTTPException(status_code=503, detail="Too many analyses in progress. Please try again shortly.")
+    return JSONResponse(
+        status_code=202,
+        content={
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"/jobs/{job.id}"
+        }
+    )
+
+
+def _owned(job: dict | None, current_user: UserProfile) -> dict:
+    if job is None or job["user_id"] != current_user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str, current_user: UserProfile = Depends(get_current_profile)):
+    """
+    Current status of a job; includes the result once it is done.
+    """
+    return _owned(await get_job_manager().lookup(job_id), current_user)
+
+
+@router.get("/{job_id}/wait")
+async def wait_for_job(
+    job_id: str,
+    timeout: float = Query(default=25, ge=0, le=60),
+    current_user: UserProfile = Depends(get_current_profile)
+):
+    """
+    Long-poll variant: returns as soon as the job finishes, or after `timeout` seconds.
+    """
+    manager = get_job_manager()
+    _owned(await manager.lookup(job_id), current_user)
+    return await manager.wait(job_id, timeout)
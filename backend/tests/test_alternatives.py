@@ -0,0 +1,43 @@
+from app.integrations import alternatives
+from app.integrations.alternatives import ProductIndex
+
+CATEGORY = ["en:snacks", "en:cereals"]
+
+
+def _cereal(code, sugars, grade="c", serving=None):
+    nutriments = {"energy-kcal_100g": 380, "sugars_100g": sugars, "salt_100g": 0.5, "fat_100g": 4}
+    if serving is not None:
+        nutriments["sugars_serving"] = serving
+    return {"code": code, "product_name": f"Cereal {code}", "nutrition_grades": grade,
+            "categories_tags": CATEGORY, "nutriments": nutriments}
+
+
+def test_matrix_grows_in_chunks_and_keeps_rows(monkeypatch):
+    monkeypatch.setattr(alternatives, "MATRIX_CHUNK", 4)
+    index = ProductIndex(maxsize=10)
+    for n in range(10):
+        assert index.add(str(n), _cereal(str(n), sugars=n))
+    assert index._matrix.shape[0] == 10
+    assert not index.add("extra", _cereal("extra", sugars=1))
+
+    index.add("3", _cereal("3", sugars=40))
+    sugars = index._matrix[:, list(alternatives.FEATURES).index("sugars_100g")] * 100
+    assert sugars.round(6).tolist() == [0, 1, 2, 40, 4, 5, 6, 7, 8, 9]
+
+
+def test_alternatives_are_ranked_on_per_100g_values():
+    index = ProductIndex()
+    # A small listed serving doesn't make the sugarier cereal look better.
+    index.add("low", _cereal("low", sugars=4))
+    index.add("small-serving", _cereal("small-serving", sugars=12, serving=3))
+    index.add("mid", _cereal("mid", sugars=8))
+    for n in range(3):
+        index.add(f"high{n}", _cereal(f"high{n}", sugars=30))
+
+    product = _cereal("query", sugars=30)
+    results = index.alternatives("query", product, "diabetes")
+    assert [r["barcode"] for r in results] == ["low", "mid", "small-serving"]
+    assert results[0]["score_gain"] > 0
+    # over_limit is the rule engine's verdict, per serving where a serving is listed.
+    assert [r["over_limit"] for r in results] == [[], ["sugar"], []]
+    assert index.alternatives("query", product, "diabetes", limit=1)[0]["barcode"] == "low"
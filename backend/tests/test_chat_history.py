@@ -0,0 +1,20 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.models import ChatHistory
+from app.services import chat
+
+
+def test_cursor_round_trip():
+    record = ChatHistory(id=17, user_id=1, message="hi", response="hello",
+                         timestamp=datetime(2024, 5, 1, 12, 30, 15, 123456))
+    assert chat._decode_cursor(chat._encode_cursor(record)) == (record.timestamp, 17)
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "bm90IGpzb24="])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        chat._decode_cursor(cursor)
+    assert error.value.status_code == 400
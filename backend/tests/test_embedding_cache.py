@@ -0,0 +1,41 @@
+import os
+
+import chromadb
+
+from app.integrations import embedding_cache, rag_utils
+from app.integrations.embedding_cache import EmbeddingCache
+from app.integrations.embedding_providers import HashingEmbeddingProvider
+from app.integrations.rag_utils import ProviderEmbeddingFunction
+
+
+class RemoteProvider(HashingEmbeddingProvider):
+    remote = True
+
+    def __init__(self):
+        super().__init__(dimension=64)
+        self.calls = 0
+
+    def embed(self, texts):
+        self.calls += 1
+        return super().embed(texts)
+
+
+def test_default_path_is_next_to_the_module():
+    expected = os.path.dirname(os.path.abspath(embedding_cache.__file__))
+    assert os.path.dirname(embedding_cache.EMBEDDING_CACHE_PATH) == expected
+
+
+def test_only_query_embeddings_are_cached(monkeypatch, tmp_path):
+    cache = EmbeddingCache(path=None)
+    monkeypatch.setattr(rag_utils, "get_embedding_cache", lambda: cache)
+    provider = RemoteProvider()
+
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    collection = client.create_collection("docs", embedding_function=ProviderEmbeddingFunction(provider))
+    collection.add(ids=["a", "b"], documents=["limit added sugar", "limit sodium"])
+    assert len(cache.memory) == 0
+
+    collection.query(query_texts=["how much sugar"], n_results=1)
+    collection.query(query_texts=["how much sugar"], n_results=1)
+    assert len(cache.memory) == 1
+    assert provider.calls == 2
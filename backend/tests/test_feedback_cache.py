@@ -0,0 +1,56 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.integrations import feedback_cache
+from app.models import AIFeedbackCache
+
+
+class FakeSession:
+    """Just enough of AsyncSession for get_feedback's primary-key lookup."""
+
+    def __init__(self, row=None):
+        self.row = row
+
+    async def get(self, model, key):
+        return self.row
+
+
+@pytest.fixture(autouse=True)
+def empty_memory_tier():
+    feedback_cache._feedback.clear()
+    yield
+    feedback_cache._feedback.clear()
+
+
+def _row(product_hash, age):
+    return AIFeedbackCache(
+        barcode="123", profile_fingerprint="fp", prompt_version="v1", feedback="Safe.",
+        product_hash=product_hash, created_at=datetime.now() - age
+    )
+
+
+def test_product_hash_ignores_key_order():
+    assert feedback_cache.product_hash({"a": 1, "b": 2}) == feedback_cache.product_hash({"b": 2, "a": 1})
+    assert feedback_cache.product_hash({"a": 1}) != feedback_cache.product_hash({"a": 2})
+
+
+def test_fresh_row_for_same_product_is_served():
+    digest = feedback_cache.product_hash({"code": "123"})
+    db = FakeSession(_row(digest, timedelta(minutes=5)))
+    assert asyncio.run(feedback_cache.get_feedback(db, "123", "fp", "v1", digest)) == "Safe."
+
+
+def test_expired_row_is_a_miss():
+    digest = feedback_cache.product_hash({"code": "123"})
+    age = timedelta(seconds=feedback_cache.FEEDBACK_CACHE_TTL + 60)
+    db = FakeSession(_row(digest, age))
+    assert asyncio.run(feedback_cache.get_feedback(db, "123", "fp", "v1", digest)) is None
+
+
+def test_row_for_changed_product_is_a_miss():
+    old = feedback_cache.product_hash({"code": "123", "nutriments": {"sugars_100g": 5}})
+    new = feedback_cache.product_hash({"code": "123", "nutriments": {"sugars_100g": 25}})
+    db = FakeSession(_row(old, timedelta(minutes=5)))
+    assert asyncio.run(feedback_cache.get_feedback(db, "123", "fp", "v1", new)) is None
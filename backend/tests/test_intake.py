@@ -0,0 +1,101 @@
+import asyncio
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from app.integrations import intake
+from app.integrations.rules import build_limits
+
+BUTTER = {"nutriments": {
+    "energy-kcal_100g": 717, "fat_100g": 81, "saturated-fat_100g": 51, "saturated-fat_serving": 7.1,
+    "sodium_serving": 90,
+}}
+OLIVE_OIL = {"nutriments": {"energy-kcal_100g": 884, "fat_100g": 100, "saturated-fat_100g": 14}}
+
+
+def _item(barcode, product, day):
+    nutriments = product["nutriments"]
+    return {
+        "barcode": barcode,
+        "product_data": product,
+        "timestamp": datetime.combine(day, datetime.min.time()),
+        "fat_100g": nutriments.get("fat_100g"),
+        "saturated_fat_100g": nutriments.get("saturated-fat_100g"),
+    }
+
+
+def test_product_over_two_limits_for_one_nutrient_counts_once():
+    # Butter breaks both the per-serving and the energy-share saturated fat limit.
+    deltas = intake._deltas([_item("1", BUTTER, date(2026, 3, 4))], build_limits("high cholesterol"))
+    assert deltas[("day", date(2026, 3, 4), "saturated_fat")] == [51.0, 1, 1]
+    assert deltas[("week", date(2026, 3, 2), intake.ITEMS)] == [1.0, 1, 0]
+    assert deltas[("month", date(2026, 3, 1), "fat")] == [81.0, 1, 0]
+
+
+def test_energy_share_excess_alone_is_not_counted():
+    deltas = intake._deltas([_item("1", OLIVE_OIL, date(2026, 3, 4))], build_limits("high cholesterol"))
+    assert deltas[("day", date(2026, 3, 4), "saturated_fat")] == [14.0, 1, 0]
+    assert deltas[("day", date(2026, 3, 4), "fat")] == [100.0, 1, 0]
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    """Serves the user and pages inventory rows by barcode for rebuild_user."""
+
+    def __init__(self, user, items):
+        self.user = user
+        self.items = sorted(items, key=lambda item: item["barcode"])
+        self.pages = 0
+        self.committed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def get(self, model, key):
+        return self.user
+
+    async def exec(self, statement):
+        if getattr(statement, "is_select", False):
+            after = statement.compile().params.get("barcode_1")
+            rows = [item for item in self.items if after is None or item["barcode"] > after]
+            self.pages += 1
+            return FakeResult([SimpleNamespace(_mapping=row) for row in rows[:statement._limit]])
+        return FakeResult([])
+
+    async def commit(self):
+        self.committed = True
+
+
+def test_rebuild_user_pages_through_inventory(monkeypatch):
+    day = date(2026, 3, 4)
+    items = [_item(str(n), BUTTER if n % 2 else OLIVE_OIL, day) for n in range(5)]
+    session = FakeSession(SimpleNamespace(health_issues="high cholesterol", gender=None), items)
+    applied = []
+
+    async def apply(db, user_id, deltas):
+        applied.append(deltas)
+
+    monkeypatch.setattr(intake, "async_session", lambda: session)
+    monkeypatch.setattr(intake, "_apply", apply)
+    asyncio.run(intake.rebuild_user(7, batch_size=2))
+
+    assert session.pages == 4 and session.committed
+    totals = {}
+    for deltas in applied:
+        for (period, start, nutrient), (total, count, exceeded) in deltas.items():
+            if period == "day":
+                current = totals.setdefault(nutrient, [0.0, 0, 0])
+                current[0] += total
+                current[1] += count
+                current[2] += exceeded
+    assert totals[intake.ITEMS][1] == 5
+    assert totals["saturated_fat"] == [3 * 14.0 + 2 * 51.0, 5, 2]
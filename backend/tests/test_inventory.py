@@ -0,0 +1,41 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.services import invertory
+
+
+@pytest.mark.parametrize("sort,value", [
+    ("newest", datetime(2024, 5, 1, 12, 30, 15, 123456)),
+    ("oldest", datetime(2024, 5, 1, 12, 30, 15)),
+    ("title", "Crunchy Oats"),
+])
+def test_cursor_round_trip(sort, value):
+    cursor = invertory._encode_cursor(sort, value, "3017620422003")
+    assert invertory._decode_cursor(cursor, sort) == (value, "3017620422003")
+
+
+def test_cursor_rejects_other_sort():
+    cursor = invertory._encode_cursor("title", "Crunchy Oats", "3017620422003")
+    with pytest.raises(HTTPException) as error:
+        invertory._decode_cursor(cursor, "newest")
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "bm90IGpzb24="])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        invertory._decode_cursor(cursor, "newest")
+    assert error.value.status_code == 400
+
+
+def test_bounds_are_made_naive_local():
+    aware = datetime.fromisoformat("2024-05-01T12:00:00+00:00")
+    local = invertory._naive_local(aware)
+    assert local.tzinfo is None
+    assert local == aware.astimezone().replace(tzinfo=None)
+
+    naive = datetime(2024, 5, 1, 12, 0)
+    assert invertory._naive_local(naive) is naive
+    assert invertory._naive_local(None) is None
@@ -0,0 +1,117 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.integrations import jobs
+from app.integrations.jobs import JobManager, JobQueueFull, MemoryJobStore, DONE, PENDING, RUNNING
+
+
+def test_identical_pending_jobs_are_deduplicated():
+    async def run():
+        manager = JobManager(workers=1)
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return {"ok": True}
+
+        await manager.start()
+        try:
+            first = await manager.submit("dashboard", 1, work, dedupe_key=("dashboard", 1))
+            second = await manager.submit("dashboard", 1, work, dedupe_key=("dashboard", 1))
+            assert second is first
+            assert manager.stats()["active"] == 1
+
+            release.set()
+            result = await manager.wait(first.id, timeout=1)
+            assert result["status"] == DONE
+            assert result["result"] == {"ok": True}
+
+            third = await manager.submit("dashboard", 1, work, dedupe_key=("dashboard", 1))
+            assert third is not first
+            await manager.wait(third.id, timeout=1)
+        finally:
+            await manager.stop()
+
+    asyncio.run(run())
+
+
+def test_finished_jobs_expire_after_ttl():
+    async def run():
+        manager = JobManager(workers=1, result_ttl=timedelta(seconds=60))
+
+        async def work():
+            return 42
+
+        await manager.start()
+        try:
+            job = await manager.submit("rank", 1, work)
+            await manager.wait(job.id, timeout=1)
+
+            await manager.purge_expired()
+            assert await manager.lookup(job.id) is not None
+
+            await manager.purge_expired(now=datetime.now() + timedelta(seconds=61))
+            assert await manager.lookup(job.id) is None
+        finally:
+            await manager.stop()
+
+    asyncio.run(run())
+
+
+def test_stats_without_running_manager():
+    assert jobs._manager is None
+    assert jobs.stats() == {"workers": 0, "queued": 0, "active": 0, "retained": 0}
+
+
+class RecordingStore(MemoryJobStore):
+    """
+    Records the status of each save in the order the writes land. The first
+    write is slow, as an insert on a cold connection can be.
+    """
+
+    def __init__(self):
+        self.saved = []
+
+    async def save(self, job) -> None:
+        status = job.status
+        await asyncio.sleep(0.02 if not self.saved and status == PENDING else 0)
+        self.saved.append(status)
+
+
+def test_pending_is_persisted_before_the_worker_runs():
+    async def run():
+        store = RecordingStore()
+        manager = JobManager(workers=2, store=store)
+
+        async def work():
+            return "done"
+
+        await manager.start()
+        try:
+            job = await manager.submit("rank", 1, work)
+            await manager.wait(job.id, timeout=1)
+            await asyncio.sleep(0.05)
+        finally:
+            await manager.stop()
+        assert store.saved == [PENDING, RUNNING, DONE]
+
+    asyncio.run(run())
+
+
+def test_full_queue_is_rejected_before_anything_is_saved():
+    async def run():
+        store = RecordingStore()
+        manager = JobManager(workers=1, queue_size=1, store=store)
+
+        async def work():
+            return None
+
+        await manager.submit("rank", 1, work)
+        with pytest.raises(JobQueueFull):
+            await manager.submit("rank", 1, work)
+        assert store.saved == [PENDING]
+        assert manager.stats()["retained"] == 1
+
+    asyncio.run(run())
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from app.integrations.passwords import PasswordHasher
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(workers=1, rounds=4)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_hash_at_current_cost_is_not_rehashed(hasher):
+    async def run():
+        hashed = await hasher.hash("secret")
+        assert await hasher.rehash_if_needed("secret", hashed) is None
+
+    asyncio.run(run())
+    assert hasher.stats()["rehashed"] == 0
+
+
+def test_hash_at_old_cost_is_upgraded_and_counted(hasher):
+    async def run():
+        older = PasswordHasher(workers=1, rounds=5)
+        old = await older.hash("secret")
+        older.shutdown()
+        new = await hasher.rehash_if_needed("secret", old)
+        assert new.startswith("$2b$04$")
+        assert await hasher.verify("secret", new)
+
+    asyncio.run(run())
+    stats = hasher.stats()
+    assert stats["rehashed"] == 1
+    assert stats["completed"] == 2
+    assert stats["failed"] == 0
+
+
+def test_failed_verify_is_counted_separately(hasher):
+    async def run():
+        with pytest.raises(ValueError):
+            await hasher.verify("secret", "not-a-bcrypt-hash")
+
+    asyncio.run(run())
+    stats = hasher.stats()
+    assert stats["failed"] == 1
+    assert stats["completed"] == 0
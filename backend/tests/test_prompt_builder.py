@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+from app.integrations import prompt_builder
+from app.integrations.prompt_builder import build_inventory_context, estimate_tokens, record_usage, usage_stats
+
+
+def _item(barcode, title, grade, sugars=5.0, nova=None):
+    return SimpleNamespace(
+        barcode=barcode, title=title, nutrient_score=grade, product_data={},
+        sugars_100g=sugars, salt_100g=0.5, fat_100g=3.0, saturated_fat_100g=1.0,
+        proteins_100g=2.0, energy_kcal_100g=120.0, nova_group=nova, nutrition_grade=grade
+    )
+
+
+def test_duplicates_collapse_into_one_line_with_a_count():
+    items = [
+        _item("1", "Choco Flakes", "d"),
+        _item("2", "choco  flakes!", "d"),
+        _item("3", "Choco Flakes", "b"),
+    ]
+    text, usage = build_inventory_context(items)
+    assert text.count("Choco Flakes (x2) | Nutri-Score D") == 1
+    assert "Choco Flakes | Nutri-Score B" in text
+    assert usage["items"] == 3
+    assert usage["unique"] == 2
+    assert usage["included"] == 2
+
+
+def test_budget_is_enforced_and_lowest_priority_items_dropped():
+    items = [_item(str(i), f"Product {i:03d}", "a") for i in range(200)]
+    items.append(_item("worst", "Sugar Bomb", "e", sugars=60.0, nova=4))
+    text, usage = build_inventory_context(items, budget=200)
+
+    assert estimate_tokens(text) <= 200
+    assert usage["tokens"] <= 200
+    assert 0 < usage["included"] < usage["unique"]
+    # Worst Nutri-Score first, so it survives the cut.
+    assert "Sugar Bomb" in text.splitlines()[1]
+    assert text.endswith(f"...and {usage['unique'] - usage['included']} lower-priority items (omitted for length)\n")
+
+
+def test_record_usage_tracks_prompt_sizes(monkeypatch):
+    monkeypatch.setattr(prompt_builder, "_usage", {})
+    assert record_usage("compare", "x" * 400) == 100
+    record_usage("compare", "x" * 200)
+    assert usage_stats() == {"compare": {
+        "requests": 2, "total_tokens": 150, "max_tokens": 100, "last_tokens": 50, "avg_tokens": 75.0
+    }}
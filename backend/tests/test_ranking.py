@@ -0,0 +1,30 @@
+from app.integrations.app import local_rank, rank_score
+
+# Per 100 g, CEREAL has twice the sugar of GRANOLA; only CEREAL lists a (small) serving.
+CEREAL = {"product_name": "Cereal", "nutrition_grades": "c", "nutriments": {
+    "energy-kcal_100g": 380, "sugars_100g": 10, "sugars_serving": 3, "sodium_100g": 0.2, "sodium_serving": 0.06,
+}}
+GRANOLA = {"product_name": "Granola", "nutrition_grades": "c", "nutriments": {
+    "energy-kcal_100g": 380, "sugars_100g": 5, "sodium_100g": 0.2,
+}}
+SYRUP = {"product_name": "Syrup", "nutrition_grades": "c", "nutriments": {
+    "energy-kcal_100g": 260, "sugars_100g": 60, "sugars_serving": 12,
+}}
+CANDY = {"product_name": "Candy", "nutrition_grades": "c", "nutriments": {
+    "energy-kcal_100g": 390, "sugars_100g": 90,
+}}
+
+
+def test_products_are_ranked_on_per_100g_values_whatever_their_serving_data():
+    ranking = local_rank([CEREAL, GRANOLA, SYRUP, CANDY], "diabetes")
+    assert [entry["name"] for entry in ranking] == ["Granola", "Cereal", "Syrup", "Candy"]
+    # Verdicts still use the per-serving values where the product has them.
+    verdicts = {entry["name"]: entry["verdict"] for entry in ranking}
+    assert verdicts["Cereal"] == "Moderate"
+    assert verdicts["Granola"] == "Avoid"
+
+
+def test_rank_score_keeps_ordering_products_far_over_a_limit():
+    assert rank_score(0.0, "a", 1) == 100.0
+    assert rank_score(4.0, "c", None) > rank_score(8.0, "c", None) > rank_score(16.0, "c", None)
+    assert rank_score(None, "c", None) == 72.0
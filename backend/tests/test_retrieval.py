@@ -0,0 +1,53 @@
+import os
+
+import chromadb
+import pytest
+
+from app.integrations import embedding_providers
+from app.integrations.embedding import create_documents
+from app.integrations.embedding_providers import EmbeddingProvider, get_embedding_provider
+from app.integrations.rag_utils import get_relevant_passages, open_collection
+
+DISEASE_JSON = os.path.join(
+    os.path.dirname(__file__), "..", "app", "integrations", "data", "disease.json"
+)
+
+
+@pytest.fixture(scope="module")
+def local_guidelines(tmp_path_factory):
+    documents, metadatas = create_documents(DISEASE_JSON)
+    client = chromadb.PersistentClient(path=str(tmp_path_factory.mktemp("chroma")))
+    collection = open_collection(client, "disease-guidelines", provider=get_embedding_provider("local"))
+    collection.add(ids=[str(i) for i in range(len(documents))], documents=documents, metadatas=metadatas)
+    return collection
+
+
+@pytest.fixture(autouse=True)
+def local_provider(monkeypatch):
+    monkeypatch.setattr(embedding_providers, "EMBEDDING_PROVIDER", "local")
+
+
+@pytest.mark.parametrize("query", [
+    "Dietary guidelines for diabetes",
+    "Is this product safe? This is about nutrition guidelines for diabetes and applies to male.",
+    "how much sugar can I eat. User has diabetes and goals: lose weight.",
+    "Physiological and psychological effects of diet on diabetes. "
+    "Mechanisms linking processed food, sugar, and additives to mood and brain structure.",
+])
+def test_local_provider_finds_guidelines(local_guidelines, query):
+    assert get_relevant_passages(local_guidelines, query, n_results=3)
+
+
+@pytest.mark.parametrize("query", [
+    "what is the capital of France",
+    "what is the meaning of life",
+    "translate hello into spanish",
+    "how do I fix my car engine",
+])
+def test_local_provider_drops_unrelated_queries(local_guidelines, query):
+    assert get_relevant_passages(local_guidelines, query, n_results=3) == []
+
+
+def test_providers_must_implement_embed():
+    with pytest.raises(TypeError):
+        EmbeddingProvider()
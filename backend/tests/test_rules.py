@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+from app.integrations.rules import build_limits, inventory_summary, score_product, score_inventory, verdict_text
+
+OLIVE_OIL = {"nutriments": {
+    "energy-kcal_100g": 884, "fat_100g": 100, "saturated-fat_100g": 14, "sugars_100g": 0,
+    "carbohydrates_100g": 0, "sodium_100g": 0,
+}}
+ALMONDS = {"nutriments": {
+    "energy-kcal_100g": 579, "fat_100g": 49.9, "saturated-fat_100g": 3.8, "sugars_100g": 4.4,
+    "carbohydrates_100g": 21.6, "sodium_100g": 0.001,
+}}
+KETCHUP = {"nutriments": {
+    "energy-kcal_100g": 101, "fat_100g": 0.1, "sugars_100g": 22, "carbohydrates_100g": 24,
+    "sodium_100g": 0.9,
+}}
+COLA = {"nutriments": {
+    "energy-kcal_100g": 42, "sugars_100g": 10.6, "sugars_serving": 35, "carbohydrates_serving": 35,
+    "sodium_serving": 0.01,
+}}
+WATER_CRACKER = {"nutriments": {
+    "energy-kcal_100g": 400, "sugars_serving": 0.2, "carbohydrates_serving": 8, "sodium_serving": 0.05,
+}}
+
+
+def test_sugar_limit_without_positive_per_serving_value_uses_share_of_daily():
+    limits = {limit["category"]: limit for limit in build_limits("diabetes")}
+    assert limits["sugar"]["threshold"] == 5.0
+    assert limits["sodium"]["threshold"] == 800.0
+
+
+def test_energy_share_limits_never_make_avoid_clear_cut():
+    for condition in ("diabetes", "high cholesterol"):
+        result = score_product(OLIVE_OIL, condition)
+        assert not result["clear_cut"], condition
+    assert not score_product(ALMONDS, "diabetes")["clear_cut"]
+
+
+def test_per_100g_fallback_is_never_clear_cut():
+    result = score_product(KETCHUP, "diabetes")
+    assert result["verdict"] == "Avoid"
+    assert not result["clear_cut"]
+
+
+def test_real_per_serving_excess_is_clear_cut_avoid():
+    result = score_product(COLA, "diabetes")
+    assert result["verdict"] == "Avoid"
+    assert result["clear_cut"]
+    assert verdict_text(result).startswith("Avoid. This product is well over the diabetes limits for sugar (35 vs 5 g)")
+
+
+def test_per_serving_values_well_within_limits_are_clear_cut_safe():
+    result = score_product(WATER_CRACKER, "diabetes")
+    assert result["verdict"] == "Safe"
+    assert result["clear_cut"]
+
+
+def test_inventory_is_scored_in_one_batch():
+    items = [
+        SimpleNamespace(title="Cola", product_data=COLA),
+        SimpleNamespace(title="Crackers", product_data='{"nutriments": {"sugars_serving": 0.2, "sodium_serving": 0.05}}'),
+        SimpleNamespace(title="Mystery", product_data="not json"),
+    ]
+    results = score_inventory(items, "diabetes")
+    assert [r["verdict"] for r in results] == ["Avoid", "Safe", None]
+
+    summary = inventory_summary(items, "diabetes")
+    assert "(2 of 3 items scored): 1 over a limit, 0 close to one, 1 within them" in summary
+    assert "- Cola: sugar" in summary
+    assert inventory_summary(items, "none") == ""
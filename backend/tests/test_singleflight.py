@@ -0,0 +1,98 @@
+import asyncio
+
+from app.integrations.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_task():
+    async def run():
+        flight = SingleFlight("test")
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "value"
+
+        results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+        assert results == ["value"] * 5
+        assert calls == 1
+        assert flight.stats() == {"calls": 1, "coalesced": 4, "in_flight": 0}
+
+    asyncio.run(run())
+
+
+def test_cancelling_one_waiter_keeps_the_shared_call():
+    async def run():
+        flight = SingleFlight("test")
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return "value"
+
+        first = asyncio.create_task(flight.do("key", fetch))
+        second = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        release.set()
+
+        assert await second == "value"
+        assert first.cancelled()
+
+    asyncio.run(run())
+
+
+def test_cancelling_every_waiter_cancels_the_shared_call():
+    async def run():
+        flight = SingleFlight("test")
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def fetch():
+            started.set()
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiters = [asyncio.create_task(flight.do("key", fetch)) for _ in range(2)]
+        await started.wait()
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        await asyncio.sleep(0)
+        assert flight.stats()["in_flight"] == 0
+
+    asyncio.run(run())
+
+
+def test_caller_arriving_after_cancellation_starts_a_fresh_call():
+    async def run():
+        flight = SingleFlight("test")
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            try:
+                await asyncio.sleep(0.01)
+            except asyncio.CancelledError:
+                # Cleanup keeps the cancelled task alive for a while.
+                await asyncio.sleep(0.05)
+                raise
+            return calls
+
+        waiter = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        assert await flight.do("key", fetch) == 2
+
+    asyncio.run(run())